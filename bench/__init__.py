@@ -0,0 +1,14 @@
+"""
+Throughput benchmarks for the markdown pipeline.
+
+    python3 -m bench.run --pages 200 --out bench_output.json
+
+The modules in src/ import each other by bare name, so importing this
+package puts src/ on sys.path.
+"""
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
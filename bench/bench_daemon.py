@@ -0,0 +1,91 @@
+"""
+Benchmark: rebuilding one edited page through `main.py daemon` against a
+fresh `main.py --incremental` process, on a synthetic site.
+
+    python3 -m bench.bench_daemon [--pages N] [--blocks N] [--edits N]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench import SRC_DIR
+from bench.corpus import DEFAULT_MIX, generate_corpus
+
+REPO_DIR = os.path.dirname(SRC_DIR)
+MAIN = os.path.join(SRC_DIR, "main.py")
+
+
+def edit(path, i):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"\n\nEdit number {i} of this page.\n")
+
+
+def run(pages, blocks, edits):
+    with tempfile.TemporaryDirectory() as site:
+        generate_corpus(os.path.join(site, "content"), pages, blocks, DEFAULT_MIX, seed=0)
+        shutil.copytree(os.path.join(REPO_DIR, "static"), os.path.join(site, "static"))
+        shutil.copy(os.path.join(REPO_DIR, "template.html"), site)
+        page = next(
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(os.path.join(site, "content"))
+            for name in names
+            if name.endswith(".md")
+        )
+        relative_page = os.path.relpath(page, site)
+
+        quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL, "cwd": site}
+        subprocess.run([sys.executable, MAIN, "--incremental", "-q"], check=True, **quiet)
+        cli = []
+        for i in range(edits):
+            edit(page, i)
+            started = time.perf_counter()
+            subprocess.run([sys.executable, MAIN, "--incremental", "-q"], check=True, **quiet)
+            cli.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        daemon = subprocess.Popen(
+            [sys.executable, MAIN, "daemon"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, cwd=site, text=True,
+        )
+
+        def request(**fields):
+            daemon.stdin.write(json.dumps(fields) + "\n")
+            daemon.stdin.flush()
+            return json.loads(daemon.stdout.readline())
+
+        request(op="stats")
+        startup = time.perf_counter() - started
+        round_trips, served = [], []
+        for i in range(edits):
+            edit(page, edits + i)
+            started = time.perf_counter()
+            response = request(op="build", path=relative_page)
+            round_trips.append(time.perf_counter() - started)
+            served.append(response["ms"] / 1000)
+        rendered = response["rendered"], response["blocks"]
+        request(op="shutdown")
+        daemon.wait()
+
+    def ms(samples):
+        return f"{statistics.median(samples) * 1000:8.1f} ms"
+
+    print(f"{pages} pages x {blocks} blocks, one page edited {edits} times (medians)")
+    print(f"  main.py --incremental      {ms(cli)}  (fresh process each time)")
+    print(f"  daemon startup             {startup * 1000:8.1f} ms  (once: loads and builds the whole site)")
+    print(f"  daemon build, round trip   {ms(round_trips)}  ({rendered[0]} of {rendered[1]} blocks re-rendered)")
+    print(f"  daemon build, server side  {ms(served)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--blocks", type=int, default=30)
+    parser.add_argument("--edits", type=int, default=5)
+    args = parser.parse_args()
+    run(args.pages, args.blocks, args.edits)
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: link/image extraction and splitting with precompiled
+patterns and the '[' pre-check, against the previous per-call patterns.
+
+    python3 -m bench.bench_extract [--paragraphs N] [--repeat R]
+"""
+import argparse
+import re
+import timeit
+
+import bench  # noqa: F401  (puts src/ on sys.path)
+
+from bench.bench_inline import MARKUP_PARAGRAPH, PLAIN_PARAGRAPH
+from regex import extract_markdown_images, extract_markdown_links
+from split_nodes_delimiter import split_nodes_image, split_nodes_link
+from textnode import TextNode, TextType
+
+
+def legacy_extract(text):
+    # the previous implementation: raw pattern strings on every call
+    images = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    links = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return images, links
+
+
+def legacy_split(nodes):
+    # the previous implementation: re.compile per call, regex on every TEXT node
+    for pattern, text_type in (
+        (r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", TextType.IMAGE),
+        (r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", TextType.LINK),
+    ):
+        compiled = re.compile(pattern)
+        new_nodes = []
+        for node in nodes:
+            if node.text_type != TextType.TEXT:
+                new_nodes.append(node)
+                continue
+            last_index = 0
+            for match in compiled.finditer(node.text):
+                start, end = match.span()
+                if start > last_index:
+                    new_nodes.append(TextNode(node.text[last_index:start], TextType.TEXT))
+                new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+                last_index = end
+            if last_index < len(node.text):
+                new_nodes.append(TextNode(node.text[last_index:], TextType.TEXT))
+        nodes = new_nodes
+    return nodes
+
+
+def current_extract(text):
+    return extract_markdown_images(text), extract_markdown_links(text)
+
+
+def current_split(nodes):
+    return split_nodes_link(split_nodes_image(nodes))
+
+
+def run(paragraphs, repeat):
+    for label, paragraph in (("link-free prose", PLAIN_PARAGRAPH), ("linked prose", MARKUP_PARAGRAPH)):
+        texts = [paragraph] * paragraphs
+        nodes = [TextNode(paragraph, TextType.TEXT)]
+        assert legacy_extract(paragraph) == current_extract(paragraph)
+        assert legacy_split(nodes) == current_split(nodes)
+
+        for name, legacy, current, arg in (
+            ("extract", legacy_extract, current_extract, lambda t: t),
+            ("split", legacy_split, current_split, lambda t: [TextNode(t, TextType.TEXT)]),
+        ):
+            inputs = [arg(t) for t in texts]
+            before = min(timeit.repeat(lambda: [legacy(i) for i in inputs], number=1, repeat=repeat))
+            after = min(timeit.repeat(lambda: [current(i) for i in inputs], number=1, repeat=repeat))
+            print(
+                f"{label:>16} {name:>7}: before {before * 1000:8.2f} ms  after {after * 1000:8.2f} ms  "
+                f"speedup {before / after:5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.paragraphs, args.repeat)
@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: single-pass text_to_textnodes vs. the old chain of five
+split passes, on paragraph-heavy input.
+
+    python3 -m bench.bench_inline [--paragraphs N] [--repeat R]
+"""
+import argparse
+import timeit
+
+import bench  # noqa: F401  (puts src/ on sys.path)
+
+from split_nodes_delimiter import split_nodes_delimiter, split_nodes_image, split_nodes_link
+from textnode import TextNode, TextType, text_to_textnodes
+
+MARKUP_PARAGRAPH = (
+    "In the **First Age** the _Noldor_ crossed the `Helcaraxë`, and "
+    "[Fingolfin](/blog/fingolfin) sounded his trumpets as the moon rose. "
+    "See ![the map](/images/map.png) for the route they took, and **note** "
+    "how _few_ returned."
+)
+PLAIN_PARAGRAPH = (
+    "In the First Age the Noldor crossed the grinding ice, and Fingolfin "
+    "sounded his trumpets as the moon rose over the hills of Hithlum while "
+    "the host marched on towards the walls of Angband."
+)
+
+
+def chained_text_to_textnodes(text):
+    # the pre-lexer implementation, kept here as the baseline
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def run(paragraphs, repeat):
+    for label, paragraph in (("markup-dense", MARKUP_PARAGRAPH), ("plain prose", PLAIN_PARAGRAPH)):
+        texts = [paragraph] * paragraphs
+        assert [chained_text_to_textnodes(t) for t in texts[:1]] == [text_to_textnodes(t) for t in texts[:1]]
+
+        chained = min(timeit.repeat(lambda: [chained_text_to_textnodes(t) for t in texts], number=1, repeat=repeat))
+        lexer = min(timeit.repeat(lambda: [text_to_textnodes(t) for t in texts], number=1, repeat=repeat))
+        print(
+            f"{label:>12}: {paragraphs} paragraphs  "
+            f"chained {chained * 1000:8.2f} ms  single-pass {lexer * 1000:8.2f} ms  "
+            f"speedup {chained / lexer:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.paragraphs, args.repeat)
@@ -0,0 +1,57 @@
+"""
+Memory benchmark: tracemalloc peak while building (and rendering) the
+node tree for 1 MB of paragraph-heavy markdown.
+
+    python3 -m bench.bench_memory [--megabytes N]
+"""
+import argparse
+import tracemalloc
+
+import bench  # noqa: F401  (puts src/ on sys.path)
+
+from markdown_to_html import markdown_to_html_node
+
+BLOCKS = [
+    "## The Council of Elrond",
+    "In the **First Age** the _Noldor_ crossed the `Helcaraxë`, and "
+    "[Fingolfin](/blog/fingolfin) sounded his trumpets as the moon rose.",
+    "The host marched on through the long night towards the walls of "
+    "Angband, and the ice groaned beneath them as they went.",
+    "- Gandalf\n- Bilbo _Baggins_\n- Sam",
+    "> All we have to decide is what to do\n> with the time that is given us.",
+]
+
+
+def make_markdown(megabytes):
+    target = int(megabytes * 1024 * 1024)
+    blocks = []
+    size = 0
+    while size < target:
+        block = BLOCKS[len(blocks) % len(BLOCKS)]
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def run(megabytes):
+    markdown = make_markdown(megabytes)
+
+    tracemalloc.start()
+    node = markdown_to_html_node(markdown)
+    _, tree_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    html = node.to_html()
+    _, render_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_mb = 1024 * 1024 * megabytes
+    print(f"markdown: {len(markdown) / 1024 / 1024:.2f} MB, html: {len(html) / 1024 / 1024:.2f} MB")
+    print(f"peak while building tree: {tree_peak / per_mb:6.2f} MB per MB of markdown")
+    print(f"peak while rendering:     {render_peak / per_mb:6.2f} MB per MB of markdown")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=1.0)
+    args = parser.parse_args()
+    run(args.megabytes)
@@ -0,0 +1,60 @@
+"""
+Benchmark: page bytes and render time of --minify against normal output,
+on the sample content/ tree and on a synthetic corpus.
+
+    python3 -m bench.bench_minify [--pages N] [--blocks N] [--repeat R]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from bench import SRC_DIR
+from bench.corpus import DEFAULT_MIX, generate_corpus
+
+from generate_page import collect_pages, read_markdown, render_content
+from template import Template
+
+REPO_DIR = os.path.dirname(SRC_DIR)
+
+
+def measure(label, documents, template_path, basepath, repeat):
+    results = {}
+    for minify in (False, True):
+        template = Template.load(template_path, basepath, minify=minify)
+
+        def render():
+            return [template.render(*render_content(document, basepath, minify=minify)) for document in documents]
+
+        pages = render()
+        seconds = min(timeit.repeat(render, number=1, repeat=repeat))
+        results[minify] = (sum(len(page.encode("utf-8")) for page in pages), seconds)
+
+    (plain_bytes, plain_seconds), (min_bytes, min_seconds) = results[False], results[True]
+    print(
+        f"{label:>18}: {len(documents):5} pages  "
+        f"bytes {plain_bytes:>10,} -> {min_bytes:>10,} ({100 * (plain_bytes - min_bytes) / plain_bytes:4.1f}% smaller)  "
+        f"render {plain_seconds * 1000:8.1f} ms -> {min_seconds * 1000:8.1f} ms "
+        f"({100 * (min_seconds - plain_seconds) / plain_seconds:+.1f}%)"
+    )
+
+
+def run(pages, blocks, repeat):
+    template_path = os.path.join(REPO_DIR, "template.html")
+    sample = [read_markdown(path) for path, _ in collect_pages(os.path.join(REPO_DIR, "content"), "docs")]
+    measure("content/", sample, template_path, "/static-site-generator/", repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        generate_corpus(content_dir, pages, blocks, DEFAULT_MIX, seed=0)
+        corpus = [read_markdown(path) for path, _ in collect_pages(content_dir, tmp)]
+    measure("synthetic corpus", corpus, template_path, "/static-site-generator/", repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--blocks", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.pages, args.blocks, args.repeat)
@@ -0,0 +1,59 @@
+"""
+Benchmark: building the search index for a synthetic corpus from
+scratch, again with nothing changed, and after editing one page.
+
+    python3 -m bench.bench_search [--pages N] [--blocks N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import bench  # noqa: F401  (puts src/ on sys.path)
+from bench.corpus import DEFAULT_MIX, generate_corpus
+
+from generate_page import collect_pages
+from search import build_search_index
+
+
+def timed(label, pages, dest_dir, cache_path):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexed, written, outputs = build_search_index(pages, dest_dir, "/", cache_path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>14}: {elapsed * 1000:8.1f} ms  {indexed:5} pages indexed  {written:4}/{len(outputs)} files written")
+    return outputs
+
+
+def run(pages, blocks):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        dest_dir = os.path.join(tmp, "docs")
+        cache_path = os.path.join(tmp, "search.json")
+        generate_corpus(content_dir, pages, blocks, DEFAULT_MIX, seed=0)
+        page_pairs = collect_pages(content_dir, dest_dir)
+        source_bytes = sum(os.path.getsize(path) for path, _ in page_pairs)
+
+        timed("cold", page_pairs, dest_dir, cache_path)
+        timed("unchanged", page_pairs, dest_dir, cache_path)
+        edited = page_pairs[len(page_pairs) // 2][0]
+        with open(edited, "a", encoding="utf-8") as f:
+            f.write("\nA new paragraph about palantir lore.\n")
+        outputs = timed("one page edit", page_pairs, dest_dir, cache_path)
+
+        sizes = sorted(os.path.getsize(path) for path in outputs)
+        print(
+            f"{len(page_pairs)} pages, {source_bytes:,} bytes of markdown -> index of {sum(sizes):,} bytes "
+            f"in {len(sizes)} files (largest {sizes[-1]:,}, median {sizes[len(sizes) // 2]:,}), "
+            f"cache {os.path.getsize(cache_path):,} bytes"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=30)
+    args = parser.parse_args()
+    run(args.pages, args.blocks)
@@ -0,0 +1,71 @@
+"""
+Benchmark: how long `main.py watch` takes to notice an edited page, polling
+by a full scan and by inotify, on a synthetic site.
+
+    python3 -m bench.bench_watch [--pages N] [--blocks N] [--polls N]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import bench  # noqa: F401  (puts src/ on sys.path)
+from bench.corpus import DEFAULT_MIX, generate_corpus
+
+from watch import InotifyPoller, ScanPoller
+
+
+def _ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def measure(poller_class, paths, page, polls):
+    setup, poller = _ms(lambda: poller_class(paths), 1)
+    try:
+        idle, _ = _ms(poller.poll, polls)
+
+        def edit_and_poll():
+            with open(page, "a", encoding="utf-8") as f:
+                f.write("\nOne more line.\n")
+            return poller.poll()
+
+        edited, changed = _ms(edit_and_poll, polls)
+        assert changed == [page], changed
+    finally:
+        poller.close()
+    print(f"{poller_class.__name__:>13}: setup {setup:8.1f} ms  idle poll {idle:8.2f} ms  poll after an edit {edited:8.2f} ms")
+
+
+def run(pages, blocks, polls):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        static_dir = os.path.join(tmp, "static")
+        template_path = os.path.join(tmp, "template.html")
+        os.makedirs(static_dir)
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        generate_corpus(content_dir, pages, blocks, DEFAULT_MIX, seed=0)
+        page = os.path.join(content_dir, f"section{pages // 2 // 50}", f"page{pages // 2}", "index.md")
+
+        paths = [content_dir, static_dir, template_path]
+        print(f"{pages} pages, median of {polls} polls")
+        measure(ScanPoller, paths, page, polls)
+        try:
+            measure(InotifyPoller, paths, page, polls)
+        except (OSError, AttributeError) as e:
+            print(f"InotifyPoller: unavailable ({e})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40000)
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--polls", type=int, default=10)
+    args = parser.parse_args()
+    run(args.pages, args.blocks, args.polls)
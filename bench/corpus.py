@@ -0,0 +1,95 @@
+"""
+Synthetic markdown corpus generator with a configurable block mix.
+"""
+import os
+import random
+
+WORDS = (
+    "elf ring shadow mountain river council hobbit wizard tower forest "
+    "star song fire ice sword king road journey darkness light ancient"
+).split()
+
+DEFAULT_MIX = {"heading": 1, "paragraph": 4, "code": 1, "list": 1, "quote": 1}
+
+
+def parse_mix(text):
+    """
+    Parse "paragraph=4,code=1" into a block mix dict.
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown block type in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _inline(rng, count):
+    # dense inline markup: roughly every fourth word is decorated
+    parts = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.06:
+            word = f"**{word}**"
+        elif roll < 0.12:
+            word = f"_{word}_"
+        elif roll < 0.17:
+            word = f"`{word}`"
+        elif roll < 0.22:
+            word = f"[{word}](/blog/{word})"
+        elif roll < 0.24:
+            word = f"![{word}](/images/{word}.png)"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def _block(rng, kind):
+    if kind == "heading":
+        return "#" * rng.randint(2, 4) + " " + _words(rng, rng.randint(2, 6))
+    if kind == "paragraph":
+        lines = [_inline(rng, rng.randint(12, 30)) for _ in range(rng.randint(2, 6))]
+        return "\n".join(lines)
+    if kind == "code":
+        lines = [f"    {_words(rng, rng.randint(2, 8))}" for _ in range(rng.randint(10, 60))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "list":
+        count = rng.randint(5, 40)
+        if rng.random() < 0.5:
+            return "\n".join(f"- {_inline(rng, rng.randint(3, 12))}" for _ in range(count))
+        return "\n".join(f"{i + 1}. {_inline(rng, rng.randint(3, 12))}" for i in range(count))
+    if kind == "quote":
+        return "\n".join(f"> {_inline(rng, rng.randint(5, 15))}" for _ in range(rng.randint(1, 5)))
+    raise ValueError(f"Unknown block type: {kind}")
+
+
+def generate_document(rng, blocks, mix=None):
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    parts = ["# " + _words(rng, 4)]
+    parts.extend(_block(rng, kind) for kind in rng.choices(kinds, weights, k=blocks))
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(dest_dir, pages, blocks_per_page=40, mix=None, seed=0, pages_per_dir=50):
+    """
+    Write `pages` markdown files under dest_dir (nested like content/blog/<slug>/index.md)
+    and return the total number of bytes written.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for i in range(pages):
+        page_dir = os.path.join(dest_dir, f"section{i // pages_per_dir}", f"page{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        document = generate_document(rng, blocks_per_page, mix)
+        with open(os.path.join(page_dir, "index.md"), "w", encoding="utf-8") as f:
+            f.write(document)
+        total += len(document.encode("utf-8"))
+    return total
@@ -0,0 +1,130 @@
+"""
+Time each pipeline stage on a synthetic corpus and write the results as
+JSON, so runs can be compared across commits.
+
+    python3 -m bench.run [--pages N] [--blocks N] [--mix paragraph=4,code=1] [--out PATH]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+from bench import SRC_DIR
+from bench.corpus import DEFAULT_MIX, generate_corpus, parse_mix
+
+from generate_page import collect_pages, generate_pages_recursive
+from markdown_block import BlockType, block_to_block_type, markdown_to_blocks
+from markdown_to_html import markdown_to_html_node
+from textnode import text_to_textnodes
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pages, blocks, mix, seed, repeat, jobs=1):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, "content")
+        corpus_bytes = generate_corpus(content_dir, pages, blocks, mix, seed)
+
+        documents = []
+        for path, _ in collect_pages(content_dir, tmp):
+            with open(path, "r", encoding="utf-8") as f:
+                documents.append(f.read())
+        all_blocks = [block for document in documents for block in markdown_to_blocks(document)]
+        paragraphs = [
+            block.replace("\n", " ") for block in all_blocks if block_to_block_type(block) == BlockType.PARAGRAPH
+        ]
+        paragraph_bytes = sum(len(p.encode("utf-8")) for p in paragraphs)
+
+        template_path = os.path.join(tmp, "template.html")
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write("<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>")
+
+        def full_build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content_dir, template_path, os.path.join(tmp, "docs"), "/", jobs)
+
+        stages = {
+            "markdown_to_blocks": (lambda: [markdown_to_blocks(d) for d in documents], corpus_bytes),
+            "block_to_block_type": (lambda: [block_to_block_type(b) for b in all_blocks], corpus_bytes),
+            "text_to_textnodes": (lambda: [text_to_textnodes(p) for p in paragraphs], paragraph_bytes),
+            "markdown_to_html": (lambda: [markdown_to_html_node(d).to_html() for d in documents], corpus_bytes),
+            "full_build": (full_build, corpus_bytes),
+        }
+
+        results = {}
+        for name, (func, size) in stages.items():
+            timings = _time(func, repeat)
+            best = min(timings)
+            results[name] = {
+                "best_seconds": best,
+                "mean_seconds": statistics.mean(timings),
+                "mb_per_second": size / 1024 / 1024 / best if best else None,
+            }
+
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "corpus": {
+            "pages": pages,
+            "blocks_per_page": blocks,
+            "mix": mix,
+            "seed": seed,
+            "bytes": corpus_bytes,
+            "jobs": jobs,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="block weights, e.g. paragraph=4,code=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for the full build")
+    parser.add_argument("--out", help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.pages, args.blocks, args.mix, args.seed, args.repeat, args.jobs)
+
+    for name, result in report["results"].items():
+        print(f"{name:>20}: {result['best_seconds'] * 1000:9.2f} ms  {result['mb_per_second']:7.2f} MB/s")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.out}")
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 #!/bin/bash
 set -e
 
-python3 src/main.py
-python3 -m http.server 8888 --directory public
\ No newline at end of file
+# rebuild on every change and serve docs/ with live reload
+python3 src/main.py watch
@@ -0,0 +1,230 @@
+import os
+
+from compress import COMPRESS_CACHE, compress_outputs
+from copy_static import ASSET_CACHE, ASSET_MANIFEST, asset_urls, remove_output, sync_static
+from generate_page import PageBuildError, collect_pages, generate_pages
+from manifest import MANIFEST_PATH, hash_file, load_manifest, save_manifest, stat_files
+from output import SIBLING_SUFFIXES, remove_siblings
+from regex import extract_markdown_images, extract_markdown_links
+from search import SEARCH_CACHE, build_search_index, remove_search_index
+from template import TemplateResolver
+
+
+def _page_assets(src_path, template, assets):
+    # the fingerprinted URLs baked into a page: those its markdown links to
+    # (a code span that merely looks like a link counts too) and its template's
+    with open(src_path, "r", encoding="utf-8") as f:
+        markdown = f.read()
+    urls = {url for _, url in extract_markdown_images(markdown) + extract_markdown_links(markdown)}
+    urls.update(template.asset_urls)
+    return {url: assets[url] for url in sorted(urls) if url in assets}
+
+
+def _diff_pages(old_pages, pairs, templates):
+    """
+    Hash every page and the template files it depends on, and compare
+    against the manifest. Returns the new manifest entries and the pairs
+    that need rebuilding: a page is dirty when its markdown, its template
+    or any partial that template includes changed, or when a static file
+    it links to got a new fingerprint.
+    """
+    dep_hashes = {}
+    entries = {}
+    dirty = []
+
+    for src_path, dst_path in pairs:
+        template = templates.for_page(src_path)
+        deps = {}
+        for dep in template.dependencies:
+            if dep not in dep_hashes:
+                dep_hashes[dep] = hash_file(dep)
+            deps[dep] = dep_hashes[dep]
+
+        entry = {"hash": hash_file(src_path), "output": dst_path, "deps": deps}
+        if templates.assets:
+            assets = _page_assets(src_path, template, templates.assets)
+            if assets:
+                entry["assets"] = assets
+        entries[src_path] = entry
+        if old_pages.get(src_path) != entry or not os.path.exists(dst_path):
+            dirty.append((src_path, dst_path))
+
+    return entries, dirty
+
+
+def _save(manifest_path, basepath, static, pages, stamp=None, **options):
+    manifest = {"basepath": basepath, "static": static, "pages": pages}
+    # only options that are on are recorded, e.g. fingerprint=True
+    manifest.update((name, True) for name, value in options.items() if value)
+    if stamp is not None:
+        manifest["stamp"] = stamp
+    save_manifest(manifest, manifest_path)
+
+
+def build_incremental(content_dir, static_dir, template_path, dest_dir, basepath="/",
+                      manifest_path=MANIFEST_PATH, jobs=1, link_static=False, verbose=True,
+                      cache=None, io_threads=0, fingerprint=False, asset_cache=ASSET_CACHE, compress=False,
+                      compress_cache=COMPRESS_CACHE, minify=False, search=False, search_cache=SEARCH_CACHE):
+    """
+    Rebuild only what changed since the last build recorded in the manifest.
+
+    Pages are regenerated when their markdown, their template or one of
+    its partials changed (the manifest records each page's dependencies),
+    or all of them when the basepath changed. Static files are synced by size and
+    mtime (see copy_static.sync_static); with fingerprint=True they are
+    emitted under content-hashed names and pages link to those. Outputs
+    whose sources were deleted are removed. With compress=True, .gz/.br
+    siblings are kept up to date as well (see _compress), and with
+    search=True the search index (see search.build_search_index).
+
+    A successful build also stamps the manifest with the size and mtime of
+    every source and output, which lets manifest.is_up_to_date() spot a
+    no-op build without hashing or importing the renderer.
+    """
+    # stat sources before reading them, so an edit made mid-build is seen
+    # as a change next time
+    sources = stat_files((content_dir, static_dir))
+
+    old = load_manifest(manifest_path)
+    # static outputs are removed by name, even when pages start from scratch:
+    # turning fingerprinting on or off renames every one of them
+    old_static = old.get("static", {}) if os.path.isdir(dest_dir) else {}
+    if old.get("fingerprint", False) and not fingerprint:
+        remove_output(os.path.join(dest_dir, ASSET_MANIFEST), dest_dir)
+    if old.get("compress", False) and not compress:
+        for entry in old.get("pages", {}).values():
+            remove_siblings(entry["output"])
+        for output in old_static:
+            remove_siblings(output)
+    if old.get("search", False) and not search:
+        remove_search_index(dest_dir)
+    if (
+        old.get("basepath") != basepath
+        or old.get("fingerprint", False) != fingerprint
+        or old.get("minify", False) != minify
+        or not os.path.isdir(dest_dir)
+    ):
+        # the basepath, asset URLs and minify mode are baked into every page, so nothing can be reused
+        old = {}
+
+    os.makedirs(dest_dir, exist_ok=True)
+    page_pairs = collect_pages(content_dir, dest_dir)
+    page_outputs = {dst_path for _, dst_path in page_pairs}
+
+    # static files
+    previous_static = [output for output in old_static if output not in page_outputs]
+    static_files, copied, removed = sync_static(
+        static_dir, dest_dir, previous_static, link_static, verbose, fingerprint, asset_cache
+    )
+    # keyed by output: a fingerprinted file has two
+    static = {dst_path: src_path for src_path, dst_path in static_files}
+
+    # pages
+    assets = asset_urls(static_files, static_dir, dest_dir) if fingerprint else None
+    templates = TemplateResolver(template_path, content_dir, basepath, assets, minify)
+    old_pages = old.get("pages", {})
+    pages, dirty_pages = _diff_pages(old_pages, page_pairs, templates)
+    sources.update(stat_files(files={dep for entry in pages.values() for dep in entry["deps"]}))
+    try:
+        written = generate_pages(dirty_pages, templates, basepath, jobs, cache, io_threads)
+    except PageBuildError as e:
+        # keep everything that did build; failed pages stay dirty for next time
+        for src_path, _ in e.failures:
+            pages.pop(src_path, None)
+        _save(
+            manifest_path, basepath, static, pages, fingerprint=fingerprint, compress=compress, minify=minify,
+            search=search,
+        )
+        raise
+
+    # outputs of deleted pages
+    live_outputs = set(static) | page_outputs
+    for src_path in old_pages.keys() - pages.keys():
+        output = old_pages[src_path]["output"]
+        if output not in live_outputs:
+            remove_output(output, dest_dir)
+            removed += 1
+
+    if search:
+        written += _index(page_pairs, dest_dir, basepath, search_cache, live_outputs)
+
+    stamp = dict(sources, **stat_files(files=live_outputs))
+    _save(
+        manifest_path, basepath, static, pages, stamp, fingerprint=fingerprint, compress=compress, minify=minify,
+        search=search,
+    )
+
+    print(
+        f"Incremental build: {len(dirty_pages)}/{len(pages)} pages generated, "
+        f"{copied}/{len(static)} static files copied, {removed} outputs removed"
+    )
+    _report_output(written + copied, len(live_outputs), removed)
+    if compress:
+        _compress(live_outputs, jobs, compress_cache, verbose)
+
+
+def _compress(outputs, jobs, cache_path, verbose):
+    compressed, skipped, unchanged = compress_outputs(sorted(outputs), jobs, cache_path, verbose)
+    print(f"Compression: {compressed} files compressed, {skipped} not worth it, {unchanged} unchanged")
+
+
+def _index(page_pairs, dest_dir, basepath, cache_path, outputs):
+    # adds the index files to outputs and returns how many were written
+    indexed, written, index_files = build_search_index(page_pairs, dest_dir, basepath, cache_path)
+    outputs.update(index_files)
+    print(f"Search index: {indexed}/{len(page_pairs)} pages indexed, {written}/{len(index_files)} files written")
+    return written
+
+
+def _report_output(written, total, removed):
+    print(f"Output: {written} files written, {total - written} unchanged, {removed} removed")
+
+
+def _remove_stale(dest_dir, keep, compress=False):
+    # every file under dest_dir the build did not produce (precompressed
+    # siblings of kept outputs survive while compression is on)
+    removed = 0
+    for dirpath, _, filenames in os.walk(dest_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if compress and path.endswith(SIBLING_SUFFIXES) and os.path.splitext(path)[0] in keep:
+                continue
+            if path not in keep and os.path.exists(path):
+                remove_output(path, dest_dir)
+                removed += 1
+    return removed
+
+
+def build_full(content_dir, static_dir, template_path, dest_dir, basepath="/", jobs=1, verbose=True, cache=None,
+               io_threads=0, fingerprint=False, asset_cache=ASSET_CACHE, compress=False,
+               compress_cache=COMPRESS_CACHE, minify=False, search=False, search_cache=SEARCH_CACHE):
+    """
+    Regenerate every page and re-check every static file, updating
+    dest_dir in place: outputs whose bytes did not change are never
+    rewritten (so they keep their mtime and deploy uploads only carry the
+    real delta), and files the build no longer produces are removed.
+    With compress=True every compressible output also gets .gz/.br
+    siblings, recompressed only when its content changed. With
+    search=True a search index is written under dest_dir/search/; only
+    pages whose markdown changed since the last build are re-indexed.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+
+    static_files, copied, _ = sync_static(static_dir, dest_dir, (), False, verbose, fingerprint, asset_cache)
+    keep = {dst_path for _, dst_path in static_files}
+    assets = None
+    if fingerprint:
+        assets = asset_urls(static_files, static_dir, dest_dir)
+        keep.add(os.path.join(dest_dir, ASSET_MANIFEST))
+
+    page_pairs = collect_pages(content_dir, dest_dir)
+    templates = TemplateResolver(template_path, content_dir, basepath, assets, minify)
+    written = generate_pages(page_pairs, templates, basepath, jobs, cache, io_threads)
+    keep.update(dst_path for _, dst_path in page_pairs)
+    if search:
+        written += _index(page_pairs, dest_dir, basepath, search_cache, keep)
+
+    removed = _remove_stale(dest_dir, keep, compress)
+    _report_output(written + copied, len(keep), removed)
+    if compress:
+        _compress(keep, jobs, compress_cache, verbose)
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+from output import replace_file
+
+# output -> [size, mtime_ns, sha256, encodings written, encodings tried],
+# so outputs the build left untouched are neither read nor recompressed
+COMPRESS_CACHE = ".cache/compress.json"
+
+# text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".md")
+
+# sibling suffix per encoding, in the order they are tried
+ENCODINGS = {"gzip": ".gz", "br": ".br"}
+
+# smaller files, or files that shrink by less than this, are served raw
+MIN_SIZE = 256
+MIN_SAVING = 0.1
+
+
+def available_encodings():
+    return ("gzip", "br") if brotli is not None else ("gzip",)
+
+
+def is_compressible(path: str) -> bool:
+    return path.endswith(COMPRESSIBLE)
+
+
+def _encode(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the .gz byte-identical across builds
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def _write_bytes(path, data):
+    with replace_file(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+
+def compress_file(path: str, known_hash=None, encodings=("gzip",)):
+    """
+    Write path.gz (and path.br) next to path. Returns (sha256, written)
+    where written lists the encodings that paid off; siblings that don't
+    save at least MIN_SAVING are removed instead. When the content still
+    hashes to known_hash, nothing is written and written is None.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == known_hash:
+        return digest, None
+
+    written = []
+    for encoding in encodings:
+        sibling = path + ENCODINGS[encoding]
+        compressed = _encode(data, encoding) if len(data) >= MIN_SIZE else None
+        if compressed is None or len(compressed) > len(data) * (1 - MIN_SAVING):
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            continue
+        _write_bytes(sibling, compressed)
+        written.append(encoding)
+    return digest, written
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compress_outputs(paths, jobs=1, cache_path=COMPRESS_CACHE, verbose=True):
+    """
+    Precompress every compressible output in `paths`, in a process pool
+    when jobs > 1. An output is only recompressed when its content hash
+    changed since the last run (or a sibling went missing); a matching
+    size and mtime skips even the hashing. Returns (compressed, skipped,
+    unchanged): outputs that got at least one sibling, outputs recompressed
+    to no sibling because none paid off, and outputs left as they were.
+    """
+    encodings = available_encodings()
+    cache = _load_cache(cache_path)
+    fresh = {}
+    todo = []
+    for path in paths:
+        if not is_compressible(path):
+            continue
+        st = os.stat(path)
+        entry = cache.get(path)
+        if (
+            entry is None
+            or entry[4] != list(encodings)
+            or not all(os.path.exists(path + ENCODINGS[encoding]) for encoding in entry[3])
+        ):
+            todo.append((path, None, None))
+        elif entry[:2] == [st.st_size, st.st_mtime_ns]:
+            fresh[path] = entry
+        else:
+            # touched: recompress only if the bytes really changed
+            todo.append((path, entry[2], entry[3]))
+
+    def results():
+        if jobs <= 1 or len(todo) <= 1:
+            for path, known_hash, _ in todo:
+                yield compress_file(path, known_hash, encodings)
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from pool.map(
+                compress_file,
+                [path for path, _, _ in todo],
+                [known_hash for _, known_hash, _ in todo],
+                [encodings] * len(todo),
+                chunksize=16,
+            )
+
+    compressed = skipped = 0
+    for (path, _, previous), (digest, written) in zip(todo, results()):
+        if written is None:
+            written = previous  # same bytes as last time; siblings are current
+        elif written:
+            compressed += 1
+            if verbose:
+                print(f"Compressed: {path} ({', '.join(written)})")
+        else:
+            skipped += 1
+            if verbose:
+                print(f"Not compressed: {path} (not worth it)")
+        st = os.stat(path)
+        fresh[path] = [st.st_size, st.st_mtime_ns, digest, written, list(encodings)]
+
+    with replace_file(cache_path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(fresh, f)
+    return compressed, skipped, len(fresh) - compressed - skipped
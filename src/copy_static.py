@@ -1,7 +1,40 @@
+import json
 import os
 import shutil
 
-def copy_static(src: str, dst: str):
+from manifest import hash_file
+from output import remove_siblings, replace_file, write_output
+
+# sha256 of static files and of their copies under the output, keyed by
+# path and checked against size and mtime, so unchanged assets are never
+# hashed twice
+ASSET_CACHE = ".cache/assets.json"
+
+# written next to the fingerprinted files: original URL -> hashed URL
+ASSET_MANIFEST = "assets.json"
+
+# hex digits of the content hash kept in fingerprinted names
+FINGERPRINT_LENGTH = 12
+
+# static files that are requested by name (GitHub Pages reads CNAME and
+# .nojekyll, crawlers robots.txt, browsers favicon.ico) and so are never
+# fingerprinted; neither are files without an extension or under a
+# dot-directory such as .well-known/
+FIXED_NAMES = frozenset([".nojekyll", "CNAME", "robots.txt", "favicon.ico", "sitemap.xml", "humans.txt"])
+
+def copy_static(src: str, dst: str, sync=False, link=False, verbose=True, fingerprint=False, asset_cache=ASSET_CACHE):
+    """
+    Mirror src into dst. By default dst is wiped and every file copied;
+    with sync=True only changed files are copied and files under dst that
+    no longer exist in src are removed (see sync_static). With
+    fingerprint=True files are also emitted as name.<hash>.ext (see
+    fingerprint_static) and the URL mapping is returned.
+    """
+    if sync or fingerprint:
+        previous = [path for _, path in collect_static_files(dst, dst)] if os.path.isdir(dst) else []
+        files, _, _ = sync_static(src, dst, previous, link, verbose, fingerprint, asset_cache)
+        return asset_urls(files, src, dst) if fingerprint else None
+
     # Delete destination directory if it exists
     if os.path.exists(dst):
         shutil.rmtree(dst)
@@ -15,11 +48,224 @@ def copy_static(src: str, dst: str):
             dst_path = os.path.join(dst_dir, name)
 
             if os.path.isfile(src_path):
-                print(f"Copying file: {src_path} -> {dst_path}")
+                if verbose:
+                    print(f"Copying file: {src_path} -> {dst_path}")
                 shutil.copy(src_path, dst_path)
             else:
-                print(f"Creating directory: {dst_path}")
+                if verbose:
+                    print(f"Creating directory: {dst_path}")
                 os.mkdir(dst_path)
                 _copy_dir(src_path, dst_path)
 
     _copy_dir(src, dst)
+
+def collect_static_files(src: str, dst: str):
+    """
+    Return (source_path, dest_path) pairs for every file under src,
+    mirroring the layout copy_static produces under dst.
+    """
+    files = []
+
+    for name in os.listdir(src):
+        src_path = os.path.join(src, name)
+        dst_path = os.path.join(dst, name)
+
+        if os.path.isfile(src_path):
+            files.append((src_path, dst_path))
+        else:
+            files.extend(collect_static_files(src_path, dst_path))
+
+    return files
+
+
+def remove_output(path, dest_dir):
+    """
+    Delete an output whose source is gone, along with any precompressed
+    siblings, then prune any directories that were left empty by it
+    (never the destination root itself).
+    """
+    if os.path.exists(path):
+        print(f"Removing stale output: {path}")
+        os.remove(path)
+    remove_siblings(path)
+
+    root = os.path.abspath(dest_dir)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break  # not empty (or already gone)
+        parent = os.path.dirname(parent)
+
+def is_current(src_path: str, dst_path: str) -> bool:
+    """
+    True when dst_path already holds src_path's contents, judged by size
+    and mtime (copies keep the source mtime, hardlinks share it).
+    """
+    try:
+        src_stat = os.stat(src_path)
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+def copy_file(src_path: str, dst_path: str, link=False):
+    """
+    Place src_path at dst_path as a hardlink when link=True and the
+    filesystem allows it, otherwise as a copy that keeps the source mtime.
+    Either is made under a temporary name and renamed over dst_path, so
+    the old file stays in place until the new one is complete (and an
+    existing hardlink is replaced, never written through into its source).
+    Precompressed siblings of the old file are removed.
+    """
+    with replace_file(dst_path) as tmp_path:
+        linked = False
+        if link:
+            try:
+                os.link(src_path, tmp_path)
+                linked = True
+            except OSError:
+                pass  # cross-device or unsupported; fall back to a copy
+        if not linked:
+            shutil.copy2(src_path, tmp_path)
+    remove_siblings(dst_path)
+
+def keeps_name(relative_path: str) -> bool:
+    """
+    True for a static file (given relative to the static directory) that
+    must be served under its own name only, see FIXED_NAMES.
+    """
+    parts = relative_path.split(os.sep)
+    name = parts[-1]
+    return name in FIXED_NAMES or not os.path.splitext(name)[1] or any(part.startswith(".") for part in parts)
+
+def fingerprinted_path(path: str, digest: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+class HashCache:
+    """
+    sha256 of files, kept in a JSON file and keyed by path; an entry is
+    reused for as long as the file's size and mtime match it. Only the
+    entries looked up since loading are saved back.
+    """
+
+    def __init__(self, path=ASSET_CACHE):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self.fresh = {}
+
+    def hash(self, path):
+        st = os.stat(path)
+        entry = self.fresh.get(path) or self.entries.get(path)
+        if entry is None or entry[:2] != [st.st_size, st.st_mtime_ns]:
+            entry = [st.st_size, st.st_mtime_ns, hash_file(path)]
+        self.fresh[path] = entry
+        return entry[2]
+
+    def save(self):
+        if self.fresh == self.entries:
+            return
+        with replace_file(self.path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.fresh, f)
+
+def fingerprint_static(files, cache_path=ASSET_CACHE, hashes=None):
+    """
+    Rename the destination of each (source_path, dest_path) pair to
+    name.<hash>.ext, where hash is the sha256 of the file's contents.
+    Hashes are cached in cache_path (or the given HashCache) by size and
+    mtime, so a file is only read again once it changed.
+    """
+    cache = hashes or HashCache(cache_path)
+    renamed = [(src_path, fingerprinted_path(dst_path, cache.hash(src_path))) for src_path, dst_path in files]
+    if hashes is None:
+        cache.save()
+    return renamed
+
+def same_bytes(src_path: str, dst_path: str, hashes) -> bool:
+    """
+    True when dst_path holds src_path's bytes, judged by cached hashes:
+    a file whose size and mtime did not change since it was last compared
+    is never read again.
+    """
+    try:
+        if os.path.getsize(src_path) != os.path.getsize(dst_path):
+            return False
+    except OSError:
+        return False
+    return hashes.hash(src_path) == hashes.hash(dst_path)
+
+def asset_urls(files, src: str, dst: str) -> dict:
+    """
+    Map each fingerprinted file's original root-relative URL (its path
+    under src) to its hashed one (its path under dst), e.g.
+    "/images/tom.png" -> "/images/tom.3f2a9c0d1b4e.png". Plain copies
+    are left out.
+    """
+    urls = {}
+    for src_path, dst_path in files:
+        original = os.path.relpath(src_path, src)
+        hashed = os.path.relpath(dst_path, dst)
+        if hashed != original:
+            urls["/" + original.replace(os.sep, "/")] = "/" + hashed.replace(os.sep, "/")
+    return urls
+
+def write_asset_manifest(assets: dict, dst: str):
+    return write_output(os.path.join(dst, ASSET_MANIFEST), lambda f: json.dump(assets, f, indent=2, sort_keys=True))
+
+def sync_static(src: str, dst: str, previous=(), link=False, verbose=False, fingerprint=False,
+                asset_cache=ASSET_CACHE):
+    """
+    Copy only the static files whose size or mtime differ from their copy
+    under dst and whose bytes differ too (a fresh checkout changes every
+    mtime, but an identical file is left untouched; the hashes compared
+    are cached in asset_cache, so it is only read once), and remove the
+    paths in `previous` (outputs of an earlier sync) that src no longer
+    produces. dst may hold other outputs too;
+    only files named in `previous` are ever deleted.
+
+    With fingerprint=True every file is also placed under its
+    fingerprinted name (see fingerprint_static), except those keeps_name
+    picks out, and an ASSET_MANIFEST is written to dst. The plain-named
+    copy stays, so references the URL rewrite can't see, such as CSS
+    url(...) or raw HTML in markdown, still resolve.
+
+    Returns (files, copied, removed) where files is the list of
+    (source_path, dest_path) pairs now mirrored; a fingerprinted file
+    appears twice.
+    """
+    files = collect_static_files(src, dst)
+    hashes = HashCache(asset_cache)
+    if fingerprint:
+        files += fingerprint_static(
+            [(src_path, dst_path) for src_path, dst_path in files if not keeps_name(os.path.relpath(src_path, src))],
+            hashes=hashes,
+        )
+
+    copied = 0
+    for src_path, dst_path in files:
+        if is_current(src_path, dst_path) or same_bytes(src_path, dst_path, hashes):
+            continue
+        if verbose:
+            print(f"Copying file: {src_path} -> {dst_path}")
+        copy_file(src_path, dst_path, link)
+        copied += 1
+
+    current = {dst_path for _, dst_path in files}
+    removed = 0
+    for dst_path in previous:
+        if dst_path not in current:
+            remove_output(dst_path, dst)
+            removed += 1
+
+    if fingerprint:
+        write_asset_manifest(asset_urls(files, src, dst), dst)
+    hashes.save()
+
+    return files, copied, removed
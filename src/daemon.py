@@ -0,0 +1,362 @@
+"""
+A long-running build process for editor integrations and preview
+services. It keeps the site in memory (page sources, their blocks, the
+HTML of every block and the compiled templates) and answers requests
+speaking JSON lines, one request and one response per line, on stdin or
+on a Unix socket:
+
+    {"op": "build", "path": "content/blog/tom/index.md"}   one page
+    {"op": "build"}                                        the whole site
+    {"op": "render", "path": "content/index.md"}           page HTML, not written
+    {"op": "stats"}
+    {"op": "shutdown"}
+
+Every response carries "ok" and, on success, the milliseconds the
+request took ("ms"); failures carry "error" instead.
+
+    python3 src/main.py daemon [basepath] [--minify] [--socket PATH]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import time
+
+from copy_static import remove_output, sync_static
+from extract_title import extract_title
+from front_matter import split_front_matter
+from generate_page import STREAM_THRESHOLD, collect_pages, generate_page_streaming, write_text
+from manifest import MANIFEST_PATH
+from markdown_block import iter_blocks
+from markdown_to_html import block_to_html_node
+from template import SECTION_TEMPLATE, TemplateResolver
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Page:
+    """
+    What the daemon remembers about one page: the stat and text of its
+    source, and the HTML of each block keyed by the block's type and lines.
+    """
+
+    __slots__ = ("stat", "source", "meta", "title", "blocks", "template", "output_stat")
+
+    def __init__(self):
+        self.stat = None
+        self.source = None
+        self.meta = {}
+        self.title = None
+        # [((block_type, lines), html), ...] in page order
+        self.blocks = []
+        self.template = None
+        self.output_stat = None
+
+
+class SiteModel:
+    """
+    The warm site model. A page request stats the page and the template
+    files it depends on; an unchanged source is neither read nor parsed,
+    an edited one only re-renders the blocks whose text changed, and a
+    changed template only re-joins the page around the cached blocks.
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath="/", minify=False):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.minify = minify
+        self.pages = {}
+        self.static_outputs = []
+        self._load_templates()
+
+    def _load_templates(self):
+        self.templates = TemplateResolver(self.template_path, self.content_dir, self.basepath, minify=self.minify)
+        # template file or section template candidate -> stat (None: missing)
+        self.template_stamp = {}
+
+    def _section_candidates(self, src_path):
+        # every template.html that would apply to the page if it existed
+        directory = os.path.dirname(src_path)
+        root = os.path.abspath(self.content_dir)
+        while True:
+            yield os.path.join(directory, SECTION_TEMPLATE)
+            if not directory or os.path.abspath(directory) == root:
+                return
+            directory = os.path.dirname(directory)
+
+    def _check_templates(self, paths):
+        """
+        Recompile every template when one of `paths` changed since it was
+        compiled or last seen, and start tracking the ones seen for the
+        first time.
+        """
+        for path, stat in self.templates.stamps().items():
+            self.template_stamp.setdefault(path, stat)
+        fresh = {path: _stat(path) for path in paths}
+        if any(path in self.template_stamp and self.template_stamp[path] != stat for path, stat in fresh.items()):
+            self._load_templates()
+            for page in self.pages.values():
+                page.template = None
+        self.template_stamp.update(fresh)
+
+    def page_path(self, path):
+        """
+        Normalize a page path from a request (absolute, or relative to the
+        working directory) to the form collect_pages uses.
+        """
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.content_dir))
+        if relative.startswith(os.pardir) or not relative.endswith(".md"):
+            raise ValueError(f"Not a page under {self.content_dir}: {path}")
+        return os.path.join(self.content_dir, relative)
+
+    def dest_for(self, src_path):
+        relative = os.path.relpath(src_path, self.content_dir)
+        return os.path.join(self.dest_dir, os.path.splitext(relative)[0] + ".html")
+
+    def _refresh(self, src_path, page):
+        # re-read and re-parse the source if it changed; returns how many
+        # blocks had to be rendered
+        stat = _stat(src_path)
+        if stat == page.stat:
+            return 0
+        with open(src_path, "r", encoding="utf-8") as f:
+            source = f.read()
+        page.stat = stat
+        if source == page.source:
+            return 0  # touched, not edited
+
+        meta, body = split_front_matter(source)
+        cached = dict(page.blocks)
+        blocks = []
+        rendered = 0
+        for block_type, lines in iter_blocks(body.split("\n")):
+            key = (block_type, tuple(lines))
+            html = cached.get(key)
+            if html is None:
+                html = block_to_html_node(block_type, lines, self.basepath).to_html(self.minify)
+                rendered += 1
+            blocks.append((key, html))
+        page.title = extract_title(body)
+        page.source = source
+        page.blocks = blocks
+        if meta != page.meta:
+            page.template = None
+        page.meta = meta
+        page.output_stat = None
+        return rendered
+
+    def _render(self, src_path):
+        page = self.pages.get(src_path)
+        if page is None:
+            page = self.pages[src_path] = Page()
+        self._check_templates(self.templates.files() | set(self._section_candidates(src_path)))
+        try:
+            rendered = self._refresh(src_path, page)
+        except Exception:
+            # forget the page, so the next request parses it from scratch
+            del self.pages[src_path]
+            raise
+        if page.template is None:
+            page.template = self.templates.for_page(src_path, page.meta)
+            page.output_stat = None
+        content = "<div>" + "".join(html for _, html in page.blocks) + "</div>"
+        return page, rendered, page.template.render(page.title, content)
+
+    def render_page(self, path):
+        _, _, html = self._render(self.page_path(path))
+        return html
+
+    def build_page(self, path):
+        src_path = self.page_path(path)
+        dest_path = self.dest_for(src_path)
+        if not os.path.isfile(src_path):
+            self.pages.pop(src_path, None)
+            existed = os.path.exists(dest_path)
+            remove_output(dest_path, self.dest_dir)
+            return {"output": dest_path, "removed": existed}
+
+        if os.path.getsize(src_path) >= STREAM_THRESHOLD:
+            # too big to keep in memory; render it block by block as usual
+            self.pages.pop(src_path, None)
+            template = self.templates.for_page(src_path)
+            return {"output": dest_path, "written": generate_page_streaming(src_path, template, dest_path)}
+
+        page, rendered, html = self._render(src_path)
+        if page.output_stat is not None and page.output_stat == _stat(dest_path):
+            written = False  # still holds what was last written
+        else:
+            written = write_text(dest_path, html)
+            page.output_stat = _stat(dest_path)
+        return {"output": dest_path, "written": written, "blocks": len(page.blocks), "rendered": rendered}
+
+    def build_site(self):
+        """
+        Bring the whole output up to date: sync static files, build every
+        page and remove the outputs of pages that are gone.
+        """
+        files, copied, removed = sync_static(self.static_dir, self.dest_dir, self.static_outputs)
+        self.static_outputs = [dst_path for _, dst_path in files]
+
+        self._check_templates(self.templates.files() | self.template_stamp.keys())
+        written = 0
+        failures = {}
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        for src_path, _ in pages:
+            try:
+                written += self.build_page(src_path)["written"]
+            except Exception as e:
+                failures[src_path] = str(e)
+        for src_path in self.pages.keys() - {src_path for src_path, _ in pages}:
+            removed += self.build_page(src_path)["removed"]
+
+        result = {"pages": len(pages), "written": written, "copied": copied, "removed": removed}
+        if failures:
+            result["failures"] = failures
+        return result
+
+    def stats(self):
+        return {
+            "pages": len(self.pages),
+            "blocks": sum(len(page.blocks) for page in self.pages.values()),
+            "source_bytes": sum(len(page.source) for page in self.pages.values()),
+            "fragment_bytes": sum(len(html) for page in self.pages.values() for _, html in page.blocks),
+            "templates": sorted(self.templates.files()),
+        }
+
+
+def handle(model, request):
+    """
+    Run one request against the model and return its response.
+    """
+    started = time.perf_counter()
+    try:
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        op = request.get("op")
+        if op == "build":
+            result = model.build_page(request["path"]) if "path" in request else model.build_site()
+        elif op == "render":
+            if "path" not in request:
+                raise ValueError("render needs a path")
+            result = {"html": model.render_page(request["path"])}
+        elif op == "stats":
+            result = model.stats()
+        elif op == "shutdown":
+            result = {}
+        else:
+            raise ValueError(f"unknown op: {op!r}")
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    result.update(ok=True, ms=round((time.perf_counter() - started) * 1000, 3))
+    return result
+
+
+def serve_stream(model, infile, outfile):
+    """
+    Answer JSON-line requests from infile on outfile until EOF or a
+    shutdown request. Returns True after a shutdown request.
+    """
+    for line in infile:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"ok": False, "error": f"invalid JSON: {e}"}
+        else:
+            # build messages go to stderr; outfile carries only responses
+            with contextlib.redirect_stdout(sys.stderr):
+                response = handle(model, request)
+        outfile.write(json.dumps(response) + "\n")
+        outfile.flush()
+        if isinstance(request, dict) and request.get("op") == "shutdown":
+            return True
+    return False
+
+
+def _remove_stale_socket(path):
+    """
+    Remove the socket a killed daemon left at path. Anything else there,
+    a regular file or the socket of a daemon still listening, is an error.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"Not a socket: {path}")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)  # nobody is listening
+            return
+    raise FileExistsError(f"A daemon is already listening on {path}")
+
+
+def serve_socket(model, path):
+    """
+    Listen on a Unix socket; each connection is a JSON-lines stream, and
+    connections are served one at a time, so requests never interleave.
+    """
+    stop = []
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            infile = io.TextIOWrapper(self.rfile, encoding="utf-8")
+            outfile = io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True)
+            if serve_stream(model, infile, outfile):
+                stop.append(True)
+
+    _remove_stale_socket(path)
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        try:
+            while not stop:
+                server.handle_request()
+        finally:
+            os.remove(path)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py daemon", description="Keep the site in memory and rebuild pages on request"
+    )
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    parser.add_argument("--minify", action="store_true", help="render minified pages (see main.py --minify)")
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of stdin/stdout")
+    args = parser.parse_args(argv)
+
+    # pages the daemon writes are not recorded in the manifest, so the next
+    # --incremental build must not trust it
+    if os.path.exists(MANIFEST_PATH):
+        os.remove(MANIFEST_PATH)
+
+    model = SiteModel("content", "static", "template.html", "docs", args.basepath, args.minify)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        result = model.build_site()
+    print(
+        f"Daemon ready: {result['pages']} pages in memory, {result['written']} written "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+    if args.socket:
+        print(f"Listening on {args.socket}", file=sys.stderr)
+        serve_socket(model, args.socket)
+    else:
+        serve_stream(model, sys.stdin, sys.stdout)
@@ -1,10 +1,19 @@
-def extract_title(markdown: str) -> str:
+def extract_title_from_lines(lines) -> str:
     """
-    Extract the first h1 (# heading) from the markdown text.
+    Return the first h1 (# heading) from an iterable of markdown lines,
+    such as an open file; iteration stops as soon as it is found.
     If none is found, raise a ValueError.
     """
-    for line in markdown.splitlines():
+    for line in lines:
         line = line.strip()
         if line.startswith("# "):  # must be single '#' followed by space
             return line[2:].strip()
     raise ValueError("No h1 header found in markdown")
+
+
+def extract_title(markdown: str) -> str:
+    """
+    Extract the first h1 (# heading) from the markdown text.
+    If none is found, raise a ValueError.
+    """
+    return extract_title_from_lines(markdown.splitlines())
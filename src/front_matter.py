@@ -0,0 +1,56 @@
+FENCE = "---"
+
+
+def parse_front_matter(lines):
+    """
+    Parse an optional front matter block at the very top of a page:
+
+        ---
+        template: templates/blog.html
+        ---
+
+    `lines` is an iterator of lines; it is consumed up to and including
+    the closing fence. Returns (meta, consumed) where consumed is the
+    number of lines that belong to the front matter (0 when there is none).
+    A leading "---" that is never closed is not front matter but part of
+    the page (a horizontal rule in other markdown dialects).
+    """
+    first = next(lines, None)
+    if first is None or first.rstrip("\r\n") != FENCE:
+        return {}, 0
+
+    meta = {}
+    consumed = 1
+    for line in lines:
+        consumed += 1
+        line = line.rstrip("\r\n")
+        if line == FENCE:
+            return meta, consumed
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            meta[key.strip()] = value.strip()
+
+    return {}, 0
+
+
+def split_front_matter(markdown: str):
+    """
+    Return (meta, body) with the front matter block removed from markdown.
+    """
+    if not markdown.startswith(FENCE):
+        return {}, markdown
+
+    lines = markdown.split("\n")
+    meta, consumed = parse_front_matter(iter(lines))
+    if not consumed:
+        return {}, markdown
+    return meta, "\n".join(lines[consumed:])
+
+
+def read_front_matter(path):
+    """
+    Read only the front matter of a markdown file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        meta, _ = parse_front_matter(iter(f))
+    return meta
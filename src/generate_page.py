@@ -1,43 +1,226 @@
+import itertools
 import os
-import pathlib
+import threading
+from collections import deque
 
-from markdown_to_html import markdown_to_html_node
-from extract_title import extract_title
+from markdown_to_html import StreamedDocument, markdown_to_html_node
+from extract_title import extract_title, extract_title_from_lines
+from front_matter import parse_front_matter, split_front_matter
+from output import write_output
+from template import Template, TemplateResolver
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+# Sources at least this large are rendered block by block from the open
+# file instead of being read into memory (and are never parse-cached).
+STREAM_THRESHOLD = 32 * 1024 * 1024
 
-    # read markdown
+# markdown and rendered HTML that generate_pages_pipelined may hold at once
+MAX_IN_FLIGHT_BYTES = 64 * 1024 * 1024
+
+def read_markdown(from_path):
     with open(from_path, "r", encoding="utf-8") as f:
-        markdown_content = f.read()
+        return f.read()
+
+def render_content(markdown_content, basepath="/", cache=None, assets=None, minify=False):
+    """
+    Return (title, content) for a page, where content is an HTMLNode to be
+    streamed or, when it came through the ParseCache, an HTML string.
+    Links and images already carry the basepath (and fingerprinted names).
+    """
+    _, markdown_content = split_front_matter(markdown_content)
+
+    if cache is None:
+        html_node = markdown_to_html_node(markdown_content, basepath, assets)
+        return extract_title(markdown_content), html_node
 
-    # read template
-    with open(template_path, "r", encoding="utf-8") as f:
-        template_content = f.read()
+    key = cache.key(markdown_content, basepath, assets, minify)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
 
-    # convert markdown -> HTML
-    html_content = markdown_to_html_node(markdown_content).to_html()
+    html_content = markdown_to_html_node(markdown_content, basepath, assets).to_html(minify)
     title = extract_title(markdown_content)
+    cache.put(key, title, html_content)
+    return title, html_content
+
+def write_text(dest_path, text):
+    # True when the file was written, False when it already held `text`
+    return write_output(dest_path, lambda f: f.write(text))
+
+def write_page(dest_path, template, title, content):
+    # stream the final file; the full page never exists as one string
+    return write_output(dest_path, lambda f: template.write_to(f, title, content))
+
+def generate_page_streaming(from_path, template, dest_path):
+    """
+    Render a large markdown file with peak memory of roughly one block:
+    a first pass over the lines finds the title (stopping at the first h1),
+    then the blocks are parsed and written out one at a time. Returns
+    True when dest_path was written (see output.write_output).
+    """
+    def write(out):
+        with open(from_path, "r", encoding="utf-8") as src:
+            _, front_matter_lines = parse_front_matter(src)
+            src.seek(0)
+            title = extract_title_from_lines(itertools.islice(src, front_matter_lines, None))
+            src.seek(0)
+            body = itertools.islice(src, front_matter_lines, None)
+            template.write_to(out, title, StreamedDocument(body, template.basepath, template.assets))
+
+    return write_output(dest_path, write)
+
+def generate_page(from_path, template, dest_path, basepath="/", cache=None):
+    """
+    Render one markdown file into dest_path. `template` is either a path
+    to a template file or an already compiled Template. With a ParseCache,
+    pages whose markdown was rendered before skip parsing entirely.
+    Returns True when dest_path was written, False when it was already
+    up to date byte for byte.
+    """
+    if not isinstance(template, Template):
+        template = Template.load(template, basepath)
+
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+
+    if os.path.getsize(from_path) >= STREAM_THRESHOLD:
+        written = generate_page_streaming(from_path, template, dest_path)
+    else:
+        markdown_content = read_markdown(from_path)
+        title, content = render_content(
+            markdown_content, template.basepath, cache, template.assets, template.minify
+        )
+        written = write_page(dest_path, template, title, content)
+
+    print(f"Page generated: {dest_path}" if written else f"Page unchanged: {dest_path}")
+    return written
+
+class _ByteBudget:
+    """
+    Bytes held by pages between "read started" and "write finished". A
+    page may always start when nothing is held, so a page larger than the
+    whole budget still goes through, on its own.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.held = 0
+        self._changed = threading.Condition()
+
+    def _fits(self, size):
+        return not self.held or self.held + size <= self.limit
+
+    def take(self, size, blocking=True):
+        with self._changed:
+            if not blocking and not self._fits(size):
+                return False
+            self._changed.wait_for(lambda: self._fits(size))
+            self.held += size
+            return True
+
+    def resize(self, old, new):
+        # a held page changed size, e.g. its markdown became HTML
+        with self._changed:
+            self.held += new - old
+            self._changed.notify_all()
+
+    def release(self, size):
+        self.resize(size, 0)
 
-    # replace placeholders
-    full_html = template_content.replace("{{ Title }}", title)
-    full_html = full_html.replace("{{ Content }}", html_content)
+def generate_pages_pipelined(pages, template_for, basepath="/", cache=None, io_threads=4,
+                             max_in_flight_bytes=MAX_IN_FLIGHT_BYTES):
+    """
+    Generate pages with file I/O overlapped with rendering: a thread pool
+    reads sources ahead of the renderer, pages are rendered in this thread
+    in order, and a second thread pool writes the results. Each page
+    between "read started" and "write finished" is counted at its size
+    (its markdown until it is rendered, then its HTML), and no further
+    source is read while they add up to max_in_flight_bytes, so memory
+    stays bounded when the disk (or NFS) is slower than the renderer.
+    Sources of STREAM_THRESHOLD or more are not read ahead but streamed
+    when their turn comes. Returns (failures, written): a list of
+    (markdown_path, exception) pairs and the number of pages whose output
+    actually changed.
+    """
+    # concurrent.futures costs ~20 ms to import; only pay for it when used
+    from concurrent.futures import ThreadPoolExecutor
 
-    # adjust paths for GitHub Pages
-    full_html = full_html.replace('href="/', f'href="{basepath}')
-    full_html = full_html.replace('src="/', f'src="{basepath}')
+    budget = _ByteBudget(max_in_flight_bytes)
+    pending = deque()
+    failures = []
+    written = []
 
-    # ensure destination directory exists
-    pathlib.Path(os.path.dirname(dest_path)).mkdir(parents=True, exist_ok=True)
+    def finished(dest_path, was_written):
+        if was_written:
+            written.append(dest_path)
+        print(f"Page generated: {dest_path}" if was_written else f"Page unchanged: {dest_path}")
 
-    # write final file
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(full_html)
+    def write_done(dest_path, content_path, size, future):
+        budget.release(size)
+        if future.exception() is not None:
+            print(f"Error generating {content_path}: {future.exception()}")
+            failures.append((content_path, future.exception()))
+        else:
+            finished(dest_path, future.result())
 
-    print(f"Page generated: {dest_path}")
+    def render_next():
+        content_path, dest_path, size, read = pending.popleft()
+        try:
+            template = template_for(content_path)
+            print(f"Generating page from {content_path} to {dest_path} using {template.path}")
+            if read is None:
+                finished(dest_path, generate_page_streaming(content_path, template, dest_path))
+                return
+            title, content = render_content(
+                read.result(), template.basepath, cache, template.assets, template.minify
+            )
+            html = template.render(title, content)
+        except Exception as e:
+            budget.release(size)
+            print(f"Error generating {content_path}: {e}")
+            failures.append((content_path, e))
+            return
+        # the markdown is dropped; the page holds its HTML until written
+        budget.resize(size, len(html))
+        size = len(html)
+        write = writers.submit(write_text, dest_path, html)
+        write.add_done_callback(lambda future: write_done(dest_path, content_path, size, future))
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
-    pathlib.Path(dest_dir_path).mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(io_threads) as readers, ThreadPoolExecutor(io_threads) as writers:
+        for content_path, dest_path in pages:
+            try:
+                size = os.path.getsize(content_path)
+            except OSError as e:
+                print(f"Error generating {content_path}: {e}")
+                failures.append((content_path, e))
+                continue
+            if size >= STREAM_THRESHOLD:
+                # streamed block by block when its turn comes; holds nothing until then
+                pending.append((content_path, dest_path, 0, None))
+                continue
+
+            # back off: render (or wait for writes) until the page fits
+            while not budget.take(size, blocking=False):
+                if pending:
+                    render_next()
+                else:
+                    budget.take(size)
+                    break
+            pending.append((content_path, dest_path, size, readers.submit(read_markdown, content_path)))
+
+            # render whatever has already arrived without waiting on the disk
+            while pending and (pending[0][3] is None or pending[0][3].done()):
+                render_next()
+
+        while pending:
+            render_next()
+
+    return failures, len(written)
+
+def collect_pages(dir_path_content, dest_dir_path):
+    """
+    Walk the content tree and return (markdown_path, html_dest_path) pairs
+    for every page, in the same order generate_pages_recursive visits them.
+    """
+    pages = []
 
     for entry in os.listdir(dir_path_content):
         if entry.endswith(":Zone.Identifier"):
@@ -47,7 +230,84 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
         dest_path = os.path.join(dest_dir_path, entry)
 
         if os.path.isfile(content_path) and content_path.endswith(".md"):
-            html_dest_path = os.path.splitext(dest_path)[0] + ".html"
-            generate_page(content_path, template_path, html_dest_path, basepath)
+            pages.append((content_path, os.path.splitext(dest_path)[0] + ".html"))
         elif os.path.isdir(content_path):
-            generate_pages_recursive(content_path, template_path, dest_path, basepath)
+            pages.extend(collect_pages(content_path, dest_path))
+
+    return pages
+
+class PageBuildError(Exception):
+    """
+    Raised after a parallel build when one or more pages failed.
+    `failures` holds (markdown_path, exception) pairs.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{path}: {error}" for path, error in failures]
+        super().__init__(f"{len(failures)} page(s) failed to generate:\n" + "\n".join(lines))
+
+
+def generate_pages(pages, template, basepath="/", jobs=1, cache=None, io_threads=0):
+    """
+    Generate every (markdown_path, html_dest_path) pair. `template` is a
+    template path, a compiled Template, or a TemplateResolver that picks
+    one per page; each template file is compiled once for the whole batch.
+    With jobs > 1 the pages are rendered in a process pool, and with
+    io_threads > 0 reads and writes overlap rendering (see
+    generate_pages_pipelined). In both modes a failing page does not stop
+    the others, and all failures are reported together in a PageBuildError.
+    Returns how many pages were written; the rest already held the same
+    bytes and were left untouched.
+    """
+    if isinstance(template, TemplateResolver):
+        template_for = template.for_page
+    else:
+        if not isinstance(template, Template):
+            template = Template.load(template, basepath)
+        template_for = lambda content_path: template
+
+    if jobs <= 1 and io_threads > 0:
+        failures, written = generate_pages_pipelined(pages, template_for, basepath, cache, io_threads)
+        if failures:
+            raise PageBuildError(failures)
+        return written
+
+    if jobs <= 1 or len(pages) <= 1:
+        written = 0
+        for content_path, html_dest_path in pages:
+            written += generate_page(content_path, template_for(content_path), html_dest_path, basepath, cache)
+        return written
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    failures = []
+    written = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for content_path, html_dest_path in pages:
+            try:
+                page_template = template_for(content_path)
+            except Exception as e:
+                print(f"Error generating {content_path}: {e}")
+                failures.append((content_path, e))
+                continue
+            future = pool.submit(generate_page, content_path, page_template, html_dest_path, basepath, cache)
+            futures.append((content_path, future))
+        for content_path, future in futures:
+            try:
+                written += future.result()
+            except Exception as e:
+                print(f"Error generating {content_path}: {e}")
+                failures.append((content_path, e))
+
+    if failures:
+        raise PageBuildError(failures)
+    return written
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/", jobs=1, cache=None,
+                             io_threads=0, assets=None, minify=False):
+    os.makedirs(dest_dir_path, exist_ok=True)
+
+    templates = TemplateResolver(template_path, dir_path_content, basepath, assets, minify)
+    return generate_pages(collect_pages(dir_path_content, dest_dir_path), templates, basepath, jobs, cache, io_threads)
@@ -1,16 +1,73 @@
+import re
+
+# attribute values that need no quotes: no whitespace, quotes, =, <, > or `
+UNQUOTED_VALUE_RE = re.compile(r"[^\s\"'=<>`]+")
+
+# end tags HTML lets a minified page drop (an <li> always ends at the next
+# <li> or at the end of its list)
+OPTIONAL_END_TAGS = frozenset(["li"])
+
+# elements that never have content or an end tag
+VOID_TAGS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"])
+
+
+def attribute_to_html(key, value, minify=False):
+    if minify and UNQUOTED_VALUE_RE.fullmatch(str(value)):
+        return f" {key}={value}"
+    return f' {key}="{value}"'
+
+
+def write_chunks(fp, chunks, buffer_size=1 << 16):
+    """
+    Write an iterable of string chunks to fp, batching small chunks so the
+    file object sees a few large writes instead of one per tag.
+    """
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fp.write("".join(buffer))
+            buffer.clear()
+            size = 0
+    if buffer:
+        fp.write("".join(buffer))
+
+
 class HTMLNode:
+    # pages create one node per inline fragment, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, minify=False):
         raise NotImplementedError("Subclasses should implement to_html")
 
-    def props_to_html(self):
+    def iter_html(self, minify=False):
+        """
+        Yield the rendered HTML as a sequence of string chunks. With
+        minify=True the markup is as short as HTML allows (unquoted
+        attribute values where safe, optional end tags dropped).
+        """
+        yield self.to_html(minify)
+
+    def write_to(self, fp, minify=False):
+        """
+        Stream the rendered HTML into a text file object without building
+        the whole document as one string.
+        """
+        write_chunks(fp, self.iter_html(minify))
+
+    def props_to_html(self, minify=False):
         if not self.props:
             return ""
+        if minify:
+            return "".join([attribute_to_html(key, value, True) for key, value in self.props.items()])
         return "".join([f' {key}="{value}"' for key, value in self.props.items()])
 
     def __repr__(self):
@@ -18,13 +75,15 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         if value is None:
             raise ValueError("LeafNode must have a value")
         # children must always be None for a LeafNode
         super().__init__(tag=tag, value=value, children=None, props=props)
 
-    def to_html(self):
+    def to_html(self, minify=False):
         if self.value is None:
             raise ValueError("LeafNode must have a value")
 
@@ -33,19 +92,47 @@ class LeafNode(HTMLNode):
             return self.value
 
         # Otherwise, render full HTML tag
-        props_str = self.props_to_html()
+        props_str = self.props_to_html(minify)
+        if minify and self.tag in VOID_TAGS and not self.value:
+            return f"<{self.tag}{props_str}>"
         return f"<{self.tag}{props_str}>{self.value}</{self.tag}>"
     
 class ParentNode(HTMLNode):
+    """
+    Children are HTMLNodes or plain strings; a string child is emitted
+    verbatim, which is how untagged text is stored without a LeafNode.
+    """
+
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         # Required: tag and children; value is not accepted (always None)
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
+    def _check(self):
         if not self.tag:
             raise ValueError("ParentNode must have a tag")
         if self.children is None:
             raise ValueError("ParentNode must have children")
 
-        inner = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{inner}</{self.tag}>"
+    def iter_html(self, minify=False):
+        # Walk the subtree with an explicit stack: each chunk is yielded
+        # exactly once, instead of being copied into every ancestor's string.
+        # Closing tags are pushed as plain strings.
+        self._check()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                node._check()
+                yield f"<{node.tag}{node.props_to_html(minify)}>"
+                if not (minify and node.tag in OPTIONAL_END_TAGS):
+                    stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield from node.iter_html(minify)
+
+    def to_html(self, minify=False):
+        return "".join(self.iter_html(minify))
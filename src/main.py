@@ -1,25 +1,243 @@
+import argparse
 import os
-import shutil
 import sys
-from copy_static import copy_static
-from generate_page import generate_pages_recursive
+from manifest import MANIFEST_PATH, is_up_to_date
+from parse_cache import CACHE_DIR
 
-def main():
+# The renderer and build modules are imported where they are needed, so
+# that a no-op incremental build (see build_site) only pays for argparse,
+# json and a walk over the sources.
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the site from content/ and static/ into docs/")
     # basepath from CLI arg or default to "/"
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages and static files whose sources changed since the last build",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages in N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=0,
+        metavar="N",
+        help="overlap reads and writes with rendering using N I/O threads (serial builds only)",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hardlink static files into the output instead of copying (incremental builds)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="emit static files as name.<hash>.ext and point pages at those URLs (safe to cache forever)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse the template's whitespace and render pages with the shortest valid markup",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br, if the brotli module is installed) next to compressible outputs",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded full-text search index to docs/search/ (re-indexing only changed pages)",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        help="only generate the i-th of N size-balanced slices of the pages (combine them with `main.py merge`)",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="don't log every static file copied")
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse rendered markdown from an on-disk cache keyed by content and parser version",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"cache location (default: {CACHE_DIR})")
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        metavar="MB",
+        help="evict least recently used cache entries beyond this size",
+    )
+    parser.add_argument("--profile", action="store_true", help="report per-stage and per-page timings")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N", help="slowest pages to list (default: 10)")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the --profile timings as JSON")
+    parser.add_argument("--cprofile", metavar="PATH", help="dump cProfile stats for the whole build")
+    args = parser.parse_args(argv)
+    if args.profile_json:
+        args.profile = True
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.io_threads < 0:
+        parser.error("--io-threads cannot be negative")
+    if args.shard:
+        from shard import parse_shard
+        if args.incremental:
+            parser.error("--shard builds are always full builds; drop --incremental")
+        if args.fingerprint or args.compress or args.search:
+            parser.error("--fingerprint, --compress and --search are not supported with --shard")
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "watch":
+        from watch import main as watch_main
+        watch_main(argv[1:])
+        return
+    if argv and argv[0] == "merge":
+        from shard import main as merge_main
+        merge_main(argv[1:])
+        return
+    if argv and argv[0] == "daemon":
+        from daemon import main as daemon_main
+        daemon_main(argv[1:])
+        return
+
+    args = parse_args(argv)
+    try:
+        run_build(args)
+    except Exception as e:
+        # imported here: a no-op build never loads generate_page
+        from generate_page import PageBuildError
+        if not isinstance(e, PageBuildError):
+            raise
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+def run_build(args):
+    if not (args.profile or args.cprofile):
+        build_site(args)
+        return
+
+    profiler = None
+    if args.profile:
+        from profiling import BuildProfiler
+        profiler = BuildProfiler()
+        if args.jobs > 1:
+            print("--profile renders pages in-process; ignoring --jobs")
+            args.jobs = 1
+        args.io_threads = 0
+
+    cprofiler = None
+    if args.cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    try:
+        if profiler is None:
+            build_site(args)
+        else:
+            with profiler.profile():
+                build_site(args)
+    finally:
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+            print(f"cProfile stats written to {args.cprofile}")
+        if profiler is not None:
+            print(profiler.report(args.profile_top))
+            if args.profile_json:
+                profiler.dump_json(args.profile_json)
+                print(f"Profile written to {args.profile_json}")
+
+def forget_manifest():
+    # a full or shard build leaves docs/ in a state the manifest doesn't describe
+    if os.path.exists(MANIFEST_PATH):
+        os.remove(MANIFEST_PATH)
+
+def build_site(args):
+    basepath = args.basepath
 
     # for GitHub Pages, generate into docs/ instead of public/
     dest_dir = "docs"
 
-    # clean destination
-    if os.path.exists(dest_dir):
-        shutil.rmtree(dest_dir)
+    options = {
+        "fingerprint": args.fingerprint, "compress": args.compress, "minify": args.minify, "search": args.search
+    }
+    if args.incremental and is_up_to_date(("content", "static"), basepath, **options):
+        print("Incremental build: nothing changed")
+        return
+
+    cache = None
+    if args.cache:
+        from parse_cache import ParseCache
+        max_bytes = None if args.cache_max_mb is None else int(args.cache_max_mb * 1024 * 1024)
+        cache = ParseCache(args.cache_dir, max_bytes)
+
+    if args.shard:
+        import shutil
+        from shard import build_shard
+
+        # a shard's docs/ is an artifact for `main.py merge`, so start it empty
+        if os.path.exists(dest_dir):
+            shutil.rmtree(dest_dir)
+        forget_manifest()
+        index, count = args.shard
+        build_shard(
+            "content", "template.html", dest_dir, basepath, index, count, args.jobs, cache, args.io_threads, args.minify
+        )
+    elif args.incremental:
+        from build import build_incremental
+        build_incremental(
+            "content",
+            "static",
+            "template.html",
+            dest_dir,
+            basepath,
+            jobs=args.jobs,
+            link_static=args.link_static,
+            verbose=not args.quiet,
+            cache=cache,
+            io_threads=args.io_threads,
+            fingerprint=args.fingerprint,
+            minify=args.minify,
+            compress=args.compress,
+            search=args.search,
+        )
+    else:
+        from build import build_full
 
-    # copy static files
-    copy_static("static", dest_dir)
+        # docs/ is updated in place: unchanged files keep their mtime
+        forget_manifest()
+        build_full(
+            "content",
+            "static",
+            "template.html",
+            dest_dir,
+            basepath,
+            jobs=args.jobs,
+            verbose=not args.quiet,
+            cache=cache,
+            io_threads=args.io_threads,
+            fingerprint=args.fingerprint,
+            minify=args.minify,
+            compress=args.compress,
+            search=args.search,
+        )
 
-    # recursively generate all pages
-    generate_pages_recursive("content", "template.html", dest_dir, basepath)
+    if cache is not None:
+        cache.prune()
 
 if __name__ == "__main__":
     main()
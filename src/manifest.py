@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+
+# Lives next to the sources rather than in docs/ so it never gets published
+MANIFEST_PATH = ".build-manifest.json"
+MANIFEST_VERSION = 4
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the sha256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """
+    Load a previously saved manifest. A missing, unreadable or outdated
+    manifest yields an empty dict, which forces a full rebuild.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    manifest = dict(manifest, version=MANIFEST_VERSION)
+
+    # imported here: output imports hash_file from this module
+    from output import replace_file
+
+    # write to a temp file first so an interrupted build never leaves a
+    # half-written manifest behind
+    with replace_file(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _walk_stats(roots):
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                yield path, [st.st_mtime_ns, st.st_size]
+
+
+def stat_files(roots=(), files=()) -> dict:
+    """
+    Map every file under `roots`, and each of `files` that exists, to
+    [mtime_ns, size].
+    """
+    stamp = dict(_walk_stats(roots))
+    for path in files:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stamp[path] = [st.st_mtime_ns, st.st_size]
+    return stamp
+
+
+def is_up_to_date(roots, basepath="/", path: str = MANIFEST_PATH, **options) -> bool:
+    """
+    Cheap no-op check run before anything else is imported: true when the
+    manifest's stamp (size and mtime of every source under `roots`, of the
+    templates and partials pages use, and of every output) still matches
+    the disk, and the build `options` (e.g. fingerprint=True) are the ones
+    it was made with. Anything it cannot vouch for returns False, and the
+    regular hash-based incremental build decides.
+    """
+    manifest = load_manifest(path)
+    stamp = manifest.get("stamp")
+    if not stamp or manifest.get("basepath") != basepath:
+        return False
+    if any(manifest.get(name, False) != value for name, value in options.items()):
+        return False
+
+    try:
+        seen = set()
+        for file_path, entry in _walk_stats(roots):
+            if stamp.get(file_path) != entry:
+                return False
+            seen.add(file_path)
+        for file_path, entry in stamp.items():
+            if file_path not in seen:
+                st = os.stat(file_path)
+                if [st.st_mtime_ns, st.st_size] != entry:
+                    return False
+    except OSError:
+        return False
+    return True
+
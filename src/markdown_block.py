@@ -8,21 +8,71 @@ class BlockType(Enum):
     CODE = auto()
     QUOTE = auto()
 
+def _finish_block(lines):
+    # same trimming the old split-based splitter did with block.strip()
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines_to_block_type(lines), lines
+
+def iter_blocks(lines):
+    """
+    Scan markdown line by line and yield (BlockType, lines) per block.
+
+    `lines` may be any iterable of lines, including an open file, so large
+    inputs are never loaded whole. Blocks are separated by blank lines,
+    except inside a ``` fence, which always stays one CODE block.
+    """
+    block = []
+    in_fence = False
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if in_fence:
+            block.append(line)
+            if line.rstrip().endswith("```"):
+                in_fence = False
+                yield _finish_block(block)
+                block = []
+            continue
+
+        if not line.strip():
+            if block:
+                yield _finish_block(block)
+                block = []
+            continue
+
+        if not block and line.lstrip().startswith("```"):
+            block.append(line)
+            stripped = line.strip()
+            # a one-line ```code``` block closes itself
+            if len(stripped) >= 6 and stripped.endswith("```"):
+                yield _finish_block(block)
+                block = []
+            else:
+                in_fence = True
+            continue
+
+        block.append(line)
+
+    if block:
+        # also flushes an unclosed fence, which then reads as a paragraph
+        yield _finish_block(block)
+
 def markdown_to_blocks(markdown: str):
-    raw_blocks = markdown.split("\n\n")
-    blocks = [block.strip() for block in raw_blocks if block.strip()]
-    return blocks
+    return ["\n".join(lines) for _, lines in iter_blocks(markdown.split("\n"))]
 
-def block_to_block_type(block: str):
-    if block.startswith("#"):
-        prefix = block.split(" ", 1)[0]
-        if 1 <= len(prefix) <= 6 and all(ch == "#" for ch in prefix):
+def lines_to_block_type(lines):
+    first = lines[0]
+
+    if first.startswith("#"):
+        prefix = first.split(" ", 1)[0]
+        # a multi-line block whose first line has no space is not a heading
+        if 1 <= len(prefix) <= 6 and all(ch == "#" for ch in prefix) and (" " in first or len(lines) == 1):
             return BlockType.HEADING
-    if block.startswith("```") and block.endswith("```"):
+    if first.startswith("```") and lines[-1].endswith("```"):
         return BlockType.CODE
 
-    lines = block.split("\n")
-
     # Quote block: every line starts with >
     if all(line.startswith(">") for line in lines):
         return BlockType.QUOTE
@@ -36,4 +86,7 @@ def block_to_block_type(block: str):
         return BlockType.ORDERED_LIST
 
     # Otherwise: paragraph
-    return BlockType.PARAGRAPH
\ No newline at end of file
+    return BlockType.PARAGRAPH
+
+def block_to_block_type(block: str):
+    return lines_to_block_type(block.split("\n"))
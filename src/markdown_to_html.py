@@ -1,61 +1,128 @@
-from markdown_block import BlockType, block_to_block_type, markdown_to_blocks
-from textnode import text_to_textnodes
-from textnode_to_html import text_node_to_html_node
+import re
+
+from markdown_block import BlockType, iter_blocks
+from textnode import INLINE_MARKERS, TextType, text_to_textnodes
+from textnode_to_html import rewrite_basepath, text_node_to_html_node
 from htmlnode import ParentNode, LeafNode
 
-def markdown_to_html_node(markdown: str):
-    blocks = markdown_to_blocks(markdown)
+# spans whose own text is inline markdown too, e.g. a link inside bold
+NESTING_TYPES = frozenset([TextType.BOLD, TextType.ITALIC, TextType.LINK])
+
+# any of INLINE_MARKERS, for spans checked one at a time
+MARKER_RE = re.compile("[" + re.escape("".join(INLINE_MARKERS)) + "]")
+
+def _nested_span(node, basepath="/", assets=None, plain_text=None):
+    html_node = text_node_to_html_node(node, basepath, assets)
+    inner_text = None if plain_text is None else []
+    try:
+        children = text_to_children(node.text, basepath, assets, inner_text)
+    except ValueError:
+        # e.g. **snake_case**: a lone delimiter keeps the span literal
+        if plain_text is not None:
+            plain_text.append(node.text)
+        return html_node
+    if plain_text is not None:
+        plain_text.extend(inner_text)
+    return ParentNode(html_node.tag, children, html_node.props)
+
+def text_to_children(text: str, basepath="/", assets=None, plain_text=None):
+    # Untagged text becomes a plain string child instead of a LeafNode
+    if not any(marker in text for marker in INLINE_MARKERS):
+        if plain_text is not None and text:
+            plain_text.append(text)
+        return [rewrite_basepath(text, basepath)] if text else []
+    nodes = text_to_textnodes(text)
+    if plain_text is None:
+        return [
+            rewrite_basepath(n.text, basepath) if n.text_type is TextType.TEXT
+            else _nested_span(n, basepath, assets) if n.text_type in NESTING_TYPES and MARKER_RE.search(n.text)
+            else text_node_to_html_node(n, basepath, assets)
+            for n in nodes
+        ]
+
     children = []
+    for n in nodes:
+        if n.text_type in NESTING_TYPES and MARKER_RE.search(n.text):
+            children.append(_nested_span(n, basepath, assets, plain_text))
+            continue
+        children.append(
+            rewrite_basepath(n.text, basepath) if n.text_type is TextType.TEXT
+            else text_node_to_html_node(n, basepath, assets)
+        )
+        # the words a reader sees: image alt text and URLs are left out
+        if n.text_type is not TextType.IMAGE:
+            plain_text.append(n.text)
+    return children
+
+def block_to_html_node(block_type, lines, basepath="/", assets=None, plain_text=None):
+    if block_type == BlockType.PARAGRAPH:
+        # Wrap text children inside <p>
+        return ParentNode("p", text_to_children(" ".join(lines), basepath, assets, plain_text))
+
+    if block_type == BlockType.HEADING:
+        # Count how many # at start
+        first = lines[0]
+        heading_level = len(first.split(" ", 1)[0])
+        heading_text = "\n".join(lines)[heading_level + 1 :] if " " in first else ""
+        return ParentNode(f"h{heading_level}", text_to_children(heading_text, basepath, assets, plain_text))
+
+    if block_type == BlockType.CODE:
+        # Strip backticks, don’t parse inline markdown
+        inner = "\n".join(lines).strip("`").strip()
+        return ParentNode("pre", [LeafNode("code", inner)])
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-
-        if block_type == BlockType.PARAGRAPH:
-            # Wrap text children inside <p>
-            if block_type == BlockType.PARAGRAPH:
-                normalized = block.replace("\n", " ")
-                inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(normalized)]
-                children.append(ParentNode("p", inline_children))
-
-        elif block_type == BlockType.HEADING:
-            # Count how many # at start
-            heading_level = len(block.split(" ", 1)[0])
-            heading_text = block[heading_level + 1 :] if len(block.split(" ", 1)) > 1 else ""
-            inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(heading_text)]
-            children.append(ParentNode(f"h{heading_level}", inline_children))
-
-        elif block_type == BlockType.CODE:
-            # Strip backticks, don’t parse inline markdown
-            inner = block.strip("`").strip()
-            code_node = LeafNode("code", inner)
-            children.append(ParentNode("pre", [code_node]))
-
-        elif block_type == BlockType.QUOTE:
-            # Remove leading ">" from each line
-            quote_text = "\n".join(line.lstrip("> ") for line in block.split("\n"))
-            inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(quote_text)]
-            children.append(ParentNode("blockquote", inline_children))
-
-        elif block_type == BlockType.UNORDERED_LIST:
-            list_items = []
-            for line in block.split("\n"):
-                item_text = line[2:]  # remove "- "
-                inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(item_text)]
-                list_items.append(ParentNode("li", inline_children))
-            children.append(ParentNode("ul", list_items))
-
-        elif block_type == BlockType.ORDERED_LIST:
-            list_items = []
-            for line in block.split("\n"):
-                # remove "1. ", "2. ", etc.
-                _, item_text = line.split(". ", 1)
-                inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(item_text)]
-                list_items.append(ParentNode("li", inline_children))
-            children.append(ParentNode("ol", list_items))
-
-        else:
-            # fallback (shouldn’t happen)
-            inline_children = [text_node_to_html_node(n) for n in text_to_textnodes(block)]
-            children.append(ParentNode("p", inline_children))
+    if block_type == BlockType.QUOTE:
+        # Remove leading ">" from each line
+        quote_text = "\n".join(line.lstrip("> ") for line in lines)
+        return ParentNode("blockquote", text_to_children(quote_text, basepath, assets, plain_text))
 
+    if block_type == BlockType.UNORDERED_LIST:
+        # remove "- "
+        return ParentNode(
+            "ul", [ParentNode("li", text_to_children(line[2:], basepath, assets, plain_text)) for line in lines]
+        )
+
+    if block_type == BlockType.ORDERED_LIST:
+        list_items = []
+        for line in lines:
+            # remove "1. ", "2. ", etc.
+            _, item_text = line.split(". ", 1)
+            list_items.append(ParentNode("li", text_to_children(item_text, basepath, assets, plain_text)))
+        return ParentNode("ol", list_items)
+
+    # fallback (shouldn’t happen)
+    return ParentNode("p", text_to_children("\n".join(lines), basepath, assets, plain_text))
+
+def markdown_to_html_node(markdown: str, basepath="/", assets=None, plain_text=None):
+    """
+    Render markdown to a <div> of block nodes. Pass a list as plain_text
+    to also collect the text of every inline node (code blocks excluded),
+    e.g. for the search index.
+    """
+    # blocks are split and classified in a single scan over the lines
+    children = [
+        block_to_html_node(block_type, lines, basepath, assets, plain_text)
+        for block_type, lines in iter_blocks(markdown.split("\n"))
+    ]
     return ParentNode("div", children)
+
+class StreamedDocument:
+    """
+    Renders markdown lines (e.g. an open file) to the same <div> as
+    markdown_to_html_node, but one block at a time: only the block being
+    written is ever held in memory. Usable anywhere an HTMLNode is
+    streamed via iter_html().
+    """
+
+    __slots__ = ("lines", "basepath", "assets")
+
+    def __init__(self, lines, basepath="/", assets=None):
+        self.lines = lines
+        self.basepath = basepath
+        self.assets = assets
+
+    def iter_html(self, minify=False):
+        yield "<div>"
+        for block_type, lines in iter_blocks(self.lines):
+            yield from block_to_html_node(block_type, lines, self.basepath, self.assets).iter_html(minify)
+        yield "</div>"
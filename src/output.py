@@ -0,0 +1,68 @@
+import contextlib
+import os
+import threading
+
+from manifest import hash_file
+
+# precompressed siblings an output may have, see compress.ENCODINGS
+SIBLING_SUFFIXES = (".gz", ".br")
+
+
+def remove_siblings(path: str):
+    for suffix in SIBLING_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def same_contents(path: str, other_path: str) -> bool:
+    """
+    True when both files exist and hold the same bytes. Sizes are compared
+    first, so files that differ in length are never read.
+    """
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+    except OSError:
+        return False
+    return hash_file(path) == hash_file(other_path)
+
+
+@contextlib.contextmanager
+def replace_file(dest_path: str):
+    """
+    Yield a temporary path next to dest_path; whatever the block leaves
+    there is moved over dest_path with one os.replace, so readers never
+    see a half-written file and a failing block leaves dest_path as it
+    was. A block that removes the temporary file leaves dest_path alone.
+    """
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    # unique per process and thread, so concurrent writers never collide
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_output(dest_path: str, write) -> bool:
+    """
+    Call write(fp) on a text file next to dest_path, then move it into
+    place only if its bytes differ from what dest_path already holds.
+    Unchanged outputs keep their mtime (so rsync/CDN uploads skip them),
+    changed ones are replaced atomically, and a failing write leaves
+    dest_path as it was. Precompressed siblings of a replaced output are
+    removed, since they hold its old bytes; a compressing build writes
+    them again. Returns True when dest_path was written.
+    """
+    with replace_file(dest_path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            write(f)
+        if same_contents(tmp_path, dest_path):
+            os.remove(tmp_path)
+            return False
+    remove_siblings(dest_path)
+    return True
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sys
+
+from output import replace_file
+
+CACHE_DIR = ".cache/render"
+
+# Modules whose code decides what a page renders to. Their source is part
+# of every cache key, so editing the parser invalidates the cache by itself.
+PARSER_MODULES = (
+    "markdown_block",
+    "markdown_to_html",
+    "textnode",
+    "textnode_to_html",
+    "htmlnode",
+    "extract_title",
+    "regex",
+)
+
+_parser_version = None
+
+
+def parser_version() -> str:
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        for name in PARSER_MODULES:
+            __import__(name)
+            with open(sys.modules[name].__file__, "rb") as f:
+                digest.update(f.read())
+        _parser_version = digest.hexdigest()
+    return _parser_version
+
+
+class ParseCache:
+    """
+    On-disk cache of rendered markdown: maps a hash of (parser version,
+    basepath, asset fingerprints, minify mode, markdown) to the page's HTML fragment and title. Each entry
+    is a small JSON file; a hit refreshes its mtime, and prune() evicts
+    the least recently used entries once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, markdown: str, basepath="/", assets=None, minify=False) -> str:
+        digest = hashlib.sha256()
+        digest.update(parser_version().encode())
+        digest.update(b"\0" + basepath.encode() + b"\0")
+        if assets:
+            # fingerprinted URLs end up in the HTML, so they are part of the key
+            digest.update(json.dumps(assets, sort_keys=True).encode() + b"\0")
+        if minify:
+            digest.update(b"minify\0")
+        digest.update(markdown.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        Return (title, html) for a cached entry, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return entry["title"], entry["html"]
+
+    def put(self, key, title: str, html: str):
+        # several worker processes may write the same entry; rename is atomic
+        with replace_file(self._path(key)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"title": title, "html": html}, f)
+
+    def prune(self):
+        """
+        Evict least recently used entries until the cache fits max_bytes.
+        Returns the number of entries removed.
+        """
+        if self.max_bytes is None or not os.path.isdir(self.directory):
+            return 0
+
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,147 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+import build
+import generate_page
+import markdown_to_html
+
+# (module, function name, stage name). Stages nest: markdown_to_html_node
+# includes iter_blocks (block splitting and classification, done in one
+# scan) and text_to_textnodes.
+STAGES = (
+    (generate_page, "read_markdown", "read markdown"),
+    (markdown_to_html, "text_to_textnodes", "text_to_textnodes"),
+    (generate_page, "markdown_to_html_node", "markdown_to_html_node"),
+    (generate_page, "extract_title", "extract_title"),
+    (build, "sync_static", "copy_static"),
+)
+
+
+class BuildProfiler:
+    """
+    Records wall time per build stage and per page.
+
+    install() swaps the pipeline functions for timed wrappers (and
+    uninstall() puts them back), so an unprofiled build pays nothing.
+    Pages must be rendered in this process for their stages to be seen.
+    """
+
+    def __init__(self):
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.page_seconds = {}
+        self.wall_seconds = 0.0
+        self._originals = []
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - started
+            self.stage_calls[name] += 1
+
+    def _timed(self, func, name):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _timed_iter(self, func, name):
+        # time every step of a generator, not just creating it
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            while True:
+                with self.stage(name):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        return wrapper
+
+    def _patch(self, module, attr, replacement):
+        self._originals.append((module, attr, getattr(module, attr)))
+        setattr(module, attr, replacement)
+
+    def install(self):
+        for module, attr, name in STAGES:
+            self._patch(module, attr, self._timed(getattr(module, attr), name))
+        self._patch(
+            markdown_to_html, "iter_blocks", self._timed_iter(markdown_to_html.iter_blocks, "iter_blocks")
+        )
+
+        # Content is normally streamed straight into the file, which would
+        # lump rendering, templating and disk I/O together; split them here.
+        def write_page(dest_path, template, title, content):
+            with self.stage("to_html"):
+                html = content if isinstance(content, str) else content.to_html(template.minify)
+            with self.stage("template"):
+                page = template.render(title, html)
+            with self.stage("write page"):
+                return generate_page.write_text(dest_path, page)
+
+        self._patch(generate_page, "write_page", write_page)
+
+        original_generate = generate_page.generate_page
+
+        @wraps(original_generate)
+        def generate(from_path, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original_generate(from_path, *args, **kwargs)
+            finally:
+                self.page_seconds[from_path] = time.perf_counter() - started
+
+        self._patch(generate_page, "generate_page", generate)
+
+    def uninstall(self):
+        while self._originals:
+            module, attr, original = self._originals.pop()
+            setattr(module, attr, original)
+
+    @contextmanager
+    def profile(self):
+        self.install()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_seconds += time.perf_counter() - started
+            self.uninstall()
+
+    def slowest_pages(self, top=10):
+        return sorted(self.page_seconds.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    def report(self, top=10):
+        lines = [f"Build profile: {self.wall_seconds * 1000:.1f} ms wall, {len(self.page_seconds)} pages"]
+        lines.append(f"  {'stage':<24}{'calls':>9}{'total ms':>12}{'% wall':>9}")
+        for name, seconds in sorted(self.stage_seconds.items(), key=lambda item: item[1], reverse=True):
+            share = 100 * seconds / self.wall_seconds if self.wall_seconds else 0.0
+            lines.append(f"  {name:<24}{self.stage_calls[name]:>9}{seconds * 1000:>12.2f}{share:>8.1f}%")
+
+        if self.page_seconds:
+            lines.append(f"Slowest {min(top, len(self.page_seconds))} pages:")
+            for path, seconds in self.slowest_pages(top):
+                lines.append(f"  {seconds * 1000:10.2f} ms  {path}")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "wall_seconds": self.wall_seconds,
+            "stages": {
+                name: {"seconds": seconds, "calls": self.stage_calls[name]}
+                for name, seconds in self.stage_seconds.items()
+            },
+            "pages": dict(self.page_seconds),
+        }
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
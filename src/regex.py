@@ -1,13 +1,28 @@
 import re
-import unittest
+
+# Shared by the extractors below, the split_nodes_* helpers and the
+# single-pass inline tokenizer in textnode.py (which is why the groups are
+# named: the tokenizer combines both patterns into one alternation).
+IMAGE_PATTERN = r"!\[(?P<alt>[^\[\]]*)\]\((?P<src>[^\(\)]*)\)"
+LINK_PATTERN = r"(?<!!)\[(?P<anchor>[^\[\]]*)\]\((?P<href>[^\(\)]*)\)"
+
+IMAGE_RE = re.compile(IMAGE_PATTERN)
+LINK_RE = re.compile(LINK_PATTERN)
+
+
+def has_link_syntax(text):
+    # every image and link contains "[", so text without one needs no regex work
+    return "[" in text
+
 
 def extract_markdown_images(text):
     """
     Extract markdown image tags: ![alt](url)
     Returns list of tuples: (alt_text, url)
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    if not has_link_syntax(text):
+        return []
+    return IMAGE_RE.findall(text)
 
 
 def extract_markdown_links(text):
@@ -15,5 +30,6 @@ def extract_markdown_links(text):
     Extract markdown links: [text](url)
     Returns list of tuples: (anchor_text, url)
     """
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    if not has_link_syntax(text):
+        return []
+    return LINK_RE.findall(text)
@@ -0,0 +1,51 @@
+from collections import namedtuple
+from markdown_to_html import markdown_to_html_node
+
+# html is None when rendering failed; error then holds the exception
+RenderResult = namedtuple("RenderResult", ["html", "error"])
+
+# below this many snippets a worker pool costs more than it saves
+POOL_THRESHOLD = 256
+
+
+def _render_batch(markdowns, basepath="/"):
+    results = []
+    # one scratch buffer reused for every snippet's chunks
+    buffer = []
+    for markdown in markdowns:
+        try:
+            buffer.extend(markdown_to_html_node(markdown, basepath).iter_html())
+            results.append(RenderResult("".join(buffer), None))
+        except Exception as e:
+            results.append(RenderResult(None, e))
+        finally:
+            buffer.clear()
+    return results
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def render_many(markdowns, basepath="/", jobs=1, chunksize=128):
+    """
+    Render many markdown strings to HTML fragments in one call.
+
+    Returns a list of RenderResult in input order. A snippet that fails to
+    render gets its exception in `error` instead of aborting the batch.
+    With jobs > 1, batches of at least POOL_THRESHOLD snippets are split
+    into chunks of `chunksize` and rendered in a process pool.
+    """
+    markdowns = list(markdowns)
+    if jobs <= 1 or len(markdowns) < POOL_THRESHOLD:
+        return _render_batch(markdowns, basepath)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunks = list(_chunks(markdowns, chunksize))
+        for batch in pool.map(_render_batch, chunks, [basepath] * len(chunks)):
+            results.extend(batch)
+    return results
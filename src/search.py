@@ -0,0 +1,228 @@
+"""
+Full-text search index, written under docs/search/ at build time so the
+site can be searched without a server:
+
+    search/index.json   {"version": 1, "prefix": 2,
+                         "pages": [[url, title], ...], "shards": ["bo", ...]}
+    search/<shard>.json {"book": [id, tf, gap, tf, ...], ...}
+
+Terms are lowercased words; a term lives in the shard named by its first
+`prefix` characters, so a client loads index.json once and then fetches
+only the shards its query terms fall into. A posting list holds
+(page id, term frequency) pairs flattened into one array, with each page
+id after the first stored as the gap from the previous one. Page ids index
+"pages"; ids of deleted pages are null until a new page takes them.
+"""
+import json
+import os
+import re
+import shutil
+from collections import Counter
+
+from copy_static import remove_output
+from extract_title import extract_title
+from front_matter import split_front_matter
+from manifest import hash_file
+from markdown_to_html import markdown_to_html_node
+from output import replace_file, write_output
+
+# source -> [size, mtime_ns, sha256, page id, title, {term: frequency}],
+# so only pages whose markdown changed are parsed again
+SEARCH_CACHE = ".cache/search.json"
+
+# the index lives in this directory under the output root
+SEARCH_DIR = "search"
+SEARCH_MANIFEST = "index.json"
+
+INDEX_VERSION = 1
+
+# characters of a term that pick its shard
+SHARD_PREFIX = 2
+
+TERM_RE = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2
+
+# words too common to narrow down a search; indexing them would only
+# bloat the shards they fall into
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with"
+    .split()
+)
+
+
+def page_text(markdown: str):
+    """
+    Return (title, text) for a page. The markdown is parsed again for
+    this, separately from rendering: markdown_to_html_node collects the
+    words of its inline nodes into the text as it goes.
+    """
+    _, markdown = split_front_matter(markdown)
+    chunks = []
+    markdown_to_html_node(markdown, plain_text=chunks)
+    return extract_title(markdown), " ".join(chunks)
+
+
+def terms(text: str) -> dict:
+    """
+    Count the indexable words in text.
+    """
+    return dict(
+        Counter(
+            word for word in TERM_RE.findall(text.lower())
+            if len(word) >= MIN_TERM_LENGTH and word not in STOP_WORDS
+        )
+    )
+
+
+def page_url(dest_path: str, dest_dir: str, basepath="/") -> str:
+    # pages are linked as directories where they are an index.html
+    url = os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    if url == "index.html" or url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return basepath + url
+
+
+def encode_postings(postings):
+    """
+    Flatten (page id, frequency) pairs into [id, tf, gap, tf, ...],
+    sorted by page id.
+    """
+    flat = []
+    previous = 0
+    for page_id, frequency in sorted(postings):
+        flat.extend((page_id - previous, frequency))
+        previous = page_id
+    return flat
+
+
+def decode_postings(flat):
+    """
+    The inverse of encode_postings: a list of (page id, frequency) pairs.
+    """
+    postings = []
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        postings.append((page_id, flat[i + 1]))
+    return postings
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if cache.get("version") == INDEX_VERSION else {}
+
+
+def _save_cache(cache, path):
+    with replace_file(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+
+
+def _assign_ids(entries):
+    # pages keep their id for as long as they exist; new pages fill the
+    # holes left by deleted ones first, so unrelated shards stay as they are
+    taken = {entry[3] for entry in entries.values() if entry[3] is not None}
+    free = (page_id for page_id in range(len(entries)) if page_id not in taken)
+    for path in sorted(entries):
+        if entries[path][3] is None:
+            entries[path][3] = next(free)
+
+
+def write_json(path, data):
+    return write_output(
+        path, lambda f: json.dump(data, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    )
+
+
+def build_search_index(pages, dest_dir, basepath="/", cache_path=SEARCH_CACHE):
+    """
+    Index the (markdown_path, html_dest_path) pairs into dest_dir/search/.
+    A page is parsed again only when its markdown changed (size and mtime
+    first, then its hash), and index files are only rewritten when their
+    bytes change, so editing one page touches index.json plus the shards
+    of the words it gained or lost. Returns (indexed, written, outputs):
+    pages parsed, files written and every file the index consists of.
+    """
+    cached = _load_cache(cache_path).get("pages", {})
+    entries = {}
+    indexed = 0
+    for src_path, _ in pages:
+        st = os.stat(src_path)
+        entry = cached.get(src_path)
+        if entry is not None and entry[:2] == [st.st_size, st.st_mtime_ns]:
+            entries[src_path] = entry
+            continue
+        digest = hash_file(src_path)
+        if entry is not None and entry[2] == digest:
+            entries[src_path] = [st.st_size, st.st_mtime_ns] + entry[2:]
+            continue
+        with open(src_path, "r", encoding="utf-8") as f:
+            title, text = page_text(f.read())
+        page_id = entry[3] if entry is not None else None
+        entries[src_path] = [st.st_size, st.st_mtime_ns, digest, page_id, title, terms(text)]
+        indexed += 1
+    _assign_ids(entries)
+
+    urls = {src_path: page_url(dst_path, dest_dir, basepath) for src_path, dst_path in pages}
+    listing = [None] * (max((entry[3] for entry in entries.values()), default=-1) + 1)
+    shards = {}
+    for src_path, entry in entries.items():
+        page_id = entry[3]
+        listing[page_id] = [urls[src_path], entry[4]]
+        for term, frequency in entry[5].items():
+            shards.setdefault(term[:SHARD_PREFIX], {}).setdefault(term, []).append((page_id, frequency))
+
+    search_dir = os.path.join(dest_dir, SEARCH_DIR)
+    outputs = []
+    written = 0
+    for shard, postings in shards.items():
+        path = os.path.join(search_dir, shard + ".json")
+        written += write_json(path, {term: encode_postings(pairs) for term, pairs in postings.items()})
+        outputs.append(path)
+    manifest = {"version": INDEX_VERSION, "prefix": SHARD_PREFIX, "pages": listing, "shards": sorted(shards)}
+    path = os.path.join(search_dir, SEARCH_MANIFEST)
+    written += write_json(path, manifest)
+    outputs.append(path)
+
+    # shards whose every term has gone
+    live = set(outputs)
+    for name in os.listdir(search_dir):
+        path = os.path.join(search_dir, name)
+        if name.endswith(".json") and path not in live:
+            remove_output(path, dest_dir)
+
+    _save_cache({"version": INDEX_VERSION, "pages": entries}, cache_path)
+    return indexed, written, outputs
+
+
+def remove_search_index(dest_dir):
+    shutil.rmtree(os.path.join(dest_dir, SEARCH_DIR), ignore_errors=True)
+
+
+def query_index(dest_dir, query):
+    """
+    Look query up in a built index the way a client would: load
+    index.json, then only the shards the query's terms fall into. Returns
+    (url, title) pairs of the pages containing every term, best first.
+    """
+    search_dir = os.path.join(dest_dir, SEARCH_DIR)
+    with open(os.path.join(search_dir, SEARCH_MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    scores = None
+    for term in terms(query):
+        shard = term[: manifest["prefix"]]
+        postings = {}
+        if shard in manifest["shards"]:
+            with open(os.path.join(search_dir, shard + ".json"), "r", encoding="utf-8") as f:
+                postings = dict(decode_postings(json.load(f).get(term, [])))
+        if scores is None:
+            scores = postings
+        else:
+            scores = {page_id: scores[page_id] + tf for page_id, tf in postings.items() if page_id in scores}
+    ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], item[0]))
+    return [tuple(manifest["pages"][page_id]) for page_id, _ in ranked]
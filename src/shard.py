@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import shutil
+
+from copy_static import collect_static_files, copy_file
+from generate_page import collect_pages, generate_pages
+from manifest import hash_file
+from template import TemplateResolver
+
+# Written into each shard's output directory, and never merged into docs/
+SHARD_MANIFEST = ".shard.json"
+
+
+def parse_shard(spec: str):
+    """
+    Parse "i/N" (1-based) into (i, N).
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and {count}, got {spec!r}")
+    return index, count
+
+
+def partition(pages, count):
+    """
+    Split (markdown_path, html_dest_path) pairs into `count` shards of
+    roughly equal total markdown size: largest pages first, each to the
+    currently lightest shard. Only depends on paths and sizes, so every
+    runner of the same checkout computes the same split.
+    """
+    shards = [[] for _ in range(count)]
+    loads = [0] * count
+    sized = sorted((-os.path.getsize(pair[0]), pair) for pair in pages)
+    for negative_size, pair in sized:
+        lightest = loads.index(min(loads))
+        shards[lightest].append(pair)
+        loads[lightest] -= negative_size
+
+    # keep each shard in the order generate_pages_recursive would visit it
+    order = {pair: position for position, pair in enumerate(pages)}
+    return [sorted(shard, key=order.__getitem__) for shard in shards]
+
+
+def build_shard(content_dir, template_path, dest_dir, basepath="/", index=1, count=1, jobs=1, cache=None,
+                io_threads=0, minify=False):
+    """
+    Generate only the pages in shard `index` of `count` into dest_dir and
+    record them in dest_dir/SHARD_MANIFEST. Static files are left to
+    merge_shards, so they are copied once rather than on every shard.
+    """
+    pages = collect_pages(content_dir, dest_dir)
+    shard = partition(pages, count)[index - 1]
+
+    os.makedirs(dest_dir, exist_ok=True)
+    templates = TemplateResolver(template_path, content_dir, basepath, minify=minify)
+    generate_pages(shard, templates, basepath, jobs, cache, io_threads)
+
+    outputs = [
+        {"source": src_path, "output": os.path.relpath(dst_path, dest_dir), "hash": hash_file(dst_path)}
+        for src_path, dst_path in shard
+    ]
+    manifest = {
+        "basepath": basepath,
+        "minify": minify,
+        "shard": index,
+        "count": count,
+        "total": len(pages),
+        "pages": outputs,
+    }
+    with open(os.path.join(dest_dir, SHARD_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Shard {index}/{count}: {len(shard)}/{len(pages)} pages generated")
+
+
+class MergeError(Exception):
+    """
+    Raised when shard outputs can't be combined into one consistent site.
+    """
+
+
+def _load_shard(shard_dir):
+    try:
+        with open(os.path.join(shard_dir, SHARD_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise MergeError(f"{shard_dir}: no readable {SHARD_MANIFEST} ({e})")
+
+
+def merge_shards(shard_dirs, static_dir, dest_dir):
+    """
+    Combine the outputs of a complete set of shard builds into dest_dir,
+    together with one copy of the static files.
+
+    Fails with MergeError, before anything is written, when the shards
+    disagree on the basepath, minify mode or shard count, when a shard is missing or
+    duplicated, when pages don't add up to the site's total, when an
+    output doesn't match the hash its shard recorded, or when two inputs
+    (shards or static/) claim the same output path.
+    """
+    if any(os.path.abspath(shard_dir) == os.path.abspath(dest_dir) for shard_dir in shard_dirs):
+        raise MergeError(f"{dest_dir} cannot be both a shard and the merge destination")
+
+    shards = [(shard_dir, _load_shard(shard_dir)) for shard_dir in shard_dirs]
+    if not shards:
+        raise MergeError("no shards to merge")
+
+    first_dir, first = shards[0]
+    for shard_dir, shard in shards:
+        for key in ("basepath", "minify", "count", "total"):
+            if shard.get(key) != first.get(key):
+                raise MergeError(
+                    f"{shard_dir}: {key} {shard.get(key)!r} does not match {first_dir} ({first.get(key)!r})"
+                )
+    indexes = sorted(shard["shard"] for _, shard in shards)
+    if indexes != list(range(1, first["count"] + 1)):
+        raise MergeError(f"expected shards 1..{first['count']} exactly once, got {indexes}")
+    pages = sum(len(shard["pages"]) for _, shard in shards)
+    if pages != first["total"]:
+        raise MergeError(f"shards hold {pages} pages but the site has {first['total']}")
+
+    # output path -> (where it comes from, file to copy)
+    claimed = {}
+
+    def claim(output, origin, path):
+        if output in claimed:
+            raise MergeError(f"{output} is produced by both {claimed[output][0]} and {origin}")
+        claimed[output] = (origin, path)
+
+    for src_path, dst_path in collect_static_files(static_dir, dest_dir):
+        claim(os.path.relpath(dst_path, dest_dir), static_dir, src_path)
+    for shard_dir, shard in shards:
+        origin = f"shard {shard['shard']}/{shard['count']}"
+        for page in shard["pages"]:
+            path = os.path.join(shard_dir, page["output"])
+            if not os.path.isfile(path) or hash_file(path) != page["hash"]:
+                raise MergeError(f"{path} is missing or differs from what {origin} recorded")
+            claim(page["output"], origin, path)
+
+    if os.path.exists(dest_dir):
+        shutil.rmtree(dest_dir)
+    for output, (_, path) in sorted(claimed.items()):
+        copy_file(path, os.path.join(dest_dir, output))
+
+    print(f"Merged {len(shards)} shards: {pages} pages, {len(claimed) - pages} static files into {dest_dir}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py merge", description="Combine the outputs of `main.py --shard i/N` builds into docs/"
+    )
+    parser.add_argument("shards", nargs="+", metavar="SHARD_DIR", help="output directory of each shard build")
+    parser.add_argument("--static", default="static", help="static files to copy once (default: static)")
+    parser.add_argument("-o", "--output", default="docs", help="merged site (default: docs)")
+    args = parser.parse_args(argv)
+    try:
+        merge_shards(args.shards, args.static, args.output)
+    except MergeError as e:
+        parser.exit(1, f"merge failed: {e}\n")
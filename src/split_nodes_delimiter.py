@@ -1,5 +1,4 @@
-from enum import Enum, auto
-import re
+from regex import IMAGE_RE, LINK_RE, has_link_syntax
 from textnode import TextNode, TextType
 
 
@@ -31,12 +30,15 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 
-def split_nodes_image(old_nodes):
+def _split_nodes_pattern(old_nodes, pattern, text_type):
+    """
+    Split TEXT nodes around every match of an image or link pattern; the
+    match's two groups become the new node's text and url.
+    """
     new_nodes = []
-    pattern = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
     for node in old_nodes:
-        if node.text_type != TextType.TEXT:
+        if node.text_type != TextType.TEXT or not has_link_syntax(node.text):
             new_nodes.append(node)
             continue
 
@@ -44,14 +46,14 @@ def split_nodes_image(old_nodes):
         last_index = 0
         for match in pattern.finditer(text):
             start, end = match.span()
-            alt, url = match.groups()
+            label, url = match.groups()
 
-            # text before the image
+            # text before the match
             if start > last_index:
                 new_nodes.append(TextNode(text[last_index:start], TextType.TEXT))
 
-            # the image node
-            new_nodes.append(TextNode(alt, TextType.IMAGE, url))
+            # the image / link node
+            new_nodes.append(TextNode(label, text_type, url))
 
             last_index = end
 
@@ -62,32 +64,9 @@ def split_nodes_image(old_nodes):
     return new_nodes
 
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    pattern = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
-
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-
-        text = node.text
-        last_index = 0
-        for match in pattern.finditer(text):
-            start, end = match.span()
-            anchor, url = match.groups()
-
-            # text before the link
-            if start > last_index:
-                new_nodes.append(TextNode(text[last_index:start], TextType.TEXT))
-
-            # the link node
-            new_nodes.append(TextNode(anchor, TextType.LINK, url))
-
-            last_index = end
+def split_nodes_image(old_nodes):
+    return _split_nodes_pattern(old_nodes, IMAGE_RE, TextType.IMAGE)
 
-        # trailing text
-        if last_index < len(text):
-            new_nodes.append(TextNode(text[last_index:], TextType.TEXT))
 
-    return new_nodes
\ No newline at end of file
+def split_nodes_link(old_nodes):
+    return _split_nodes_pattern(old_nodes, LINK_RE, TextType.LINK)
@@ -0,0 +1,215 @@
+import os
+import re
+
+from front_matter import read_front_matter
+from htmlnode import UNQUOTED_VALUE_RE, write_chunks
+from textnode_to_html import rewrite_basepath
+
+PLACEHOLDER_RE = re.compile(r"\{\{ (Title|Content) \}\}")
+
+# {{> partials/header.html }} pulls in another file, relative to the template
+INCLUDE_RE = re.compile(r"\{\{> *([^}]+?) *\}\}")
+
+# root-relative URLs in the template's own markup, e.g. href="/index.css"
+URL_ATTR_RE = re.compile(r'((?:href|src)=")(/[^"]*)"')
+
+# whitespace inside these is significant and survives minification
+PRESERVED_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2>)", re.DOTALL | re.IGNORECASE)
+
+# whitespace next to these tags never renders, so minification drops it
+BLOCK_TAG = (
+    r"(?:!doctype|/?(?:html|head|body|meta|link|title|base|article|aside|div|p|h[1-6]|ul|ol|li|blockquote|pre"
+    r"|main|header|footer|nav|section|table|thead|tbody|tr|td|th|script|style|noscript|form|hr|br)\b)"
+)
+SPACE_BEFORE_BLOCK_RE = re.compile(r"\s+(?=<" + BLOCK_TAG + ")", re.IGNORECASE)
+SPACE_AFTER_BLOCK_RE = re.compile(r"(<" + BLOCK_TAG + r"[^>]*>)\s+", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^!/][^>]*>")
+QUOTED_ATTR_RE = re.compile(r'(\s[\w:-]+)="([^"]*)"')
+VOID_SELF_CLOSE_RE = re.compile(r"(<(?:meta|link|br|hr|img|input|base)\b[^>]*?)\s*/>", re.IGNORECASE)
+
+# a template.html inside a content directory applies to that section
+SECTION_TEMPLATE = "template.html"
+
+
+def rewrite_assets(html: str, assets) -> str:
+    # point references to fingerprinted static files at their hashed names
+    if not assets:
+        return html
+    return URL_ATTR_RE.sub(lambda match: f'{match.group(1)}{assets.get(match.group(2), match.group(2))}"', html)
+
+
+def _minify_tag(match):
+    tag = match.group()
+    if tag.endswith("/>"):
+        return tag  # e.g. inline SVG, where an unquoted value would swallow the "/"
+    return QUOTED_ATTR_RE.sub(
+        lambda attr: f"{attr.group(1)}={attr.group(2)}" if UNQUOTED_VALUE_RE.fullmatch(attr.group(2)) else attr.group(),
+        tag,
+    )
+
+
+def minify_markup(html: str) -> str:
+    """
+    Collapse the whitespace in template markup: runs of whitespace become
+    one space and disappear next to block-level tags, void elements lose
+    their " />", and attribute values that don't need quotes lose them.
+    <pre>, <textarea>, <script> and <style> are left as they are.
+    """
+    parts = PRESERVED_RE.split(html)
+    out = []
+    # split() yields (text, preserved block, tag name) triples
+    for i in range(0, len(parts), 3):
+        text = re.sub(r"\s+", " ", parts[i])
+        text = VOID_SELF_CLOSE_RE.sub(r"\1>", text)
+        text = SPACE_BEFORE_BLOCK_RE.sub("", text)
+        text = SPACE_AFTER_BLOCK_RE.sub(r"\1", text)
+        out.append(TAG_RE.sub(_minify_tag, text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip()
+
+
+def _expand_includes(path, dependencies, stack, stamps):
+    if path in stack:
+        raise ValueError(f"Template include cycle: {' -> '.join(stack + (path,))}")
+    if path not in dependencies:
+        dependencies.append(path)
+
+    # stat before reading, so an edit made while compiling reads as a change
+    st = os.stat(path)
+    stamps[path] = (st.st_mtime_ns, st.st_size)
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    base_dir = os.path.dirname(path)
+    return INCLUDE_RE.sub(
+        lambda match: _expand_includes(os.path.join(base_dir, match.group(1)), dependencies, stack + (path,), stamps),
+        text,
+    )
+
+
+class Template:
+    """
+    A page template split at its {{ Title }} / {{ Content }} placeholders.
+
+    The file is read and scanned once; the basepath rewrite (and, with
+    `assets`, the fingerprinted static URLs, and with `minify`, whitespace
+    collapsing) is applied to the template's own markup at compile time,
+    so rendering a page is a single join. Placeholder text that shows up
+    inside the title or the content is never substituted again.
+    """
+
+    def __init__(self, text, basepath="/", path=None, dependencies=None, assets=None, minify=False, stamps=None):
+        self.path = path
+        self.basepath = basepath
+        # static URL -> fingerprinted URL, applied to page content too
+        self.assets = assets
+        # pages rendered with this template are minified too
+        self.minify = minify
+        # every file this template was built from: itself plus its partials
+        self.dependencies = dependencies or ([path] if path else [])
+        # (mtime_ns, size) of each dependency as it was read, when loaded from files
+        self.stamps = stamps or {}
+        # the fingerprinted static URLs the template's own markup links to
+        self.asset_urls = sorted(
+            {match.group(2) for match in URL_ATTR_RE.finditer(text) if match.group(2) in assets}
+        ) if assets else []
+        text = rewrite_basepath(rewrite_assets(text, assets), basepath)
+        if minify:
+            text = minify_markup(text)
+        # even indexes are literal markup, odd indexes are placeholder names
+        self.parts = PLACEHOLDER_RE.split(text)
+
+    @classmethod
+    def load(cls, path, basepath="/", assets=None, minify=False):
+        dependencies = []
+        stamps = {}
+        text = _expand_includes(path, dependencies, (), stamps)
+        return cls(text, basepath, path, dependencies, assets, minify, stamps)
+
+    def iter_render(self, title: str, content):
+        """
+        Yield the page as string chunks. `content` is either an HTML string
+        or an HTMLNode, which is streamed chunk by chunk.
+        """
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                yield part
+            elif part == "Title":
+                yield title
+            elif isinstance(content, str):
+                yield content
+            elif self.minify:
+                yield from content.iter_html(minify=True)
+            else:
+                yield from content.iter_html()
+
+    def render(self, title: str, content) -> str:
+        return "".join(self.iter_render(title, content))
+
+    def write_to(self, fp, title: str, content):
+        write_chunks(fp, self.iter_render(title, content))
+
+    def __repr__(self):
+        return f"Template(path={self.path}, basepath={self.basepath})"
+
+
+class TemplateResolver:
+    """
+    Picks the template for each page and compiles each template file once.
+
+    A page uses, in order: the `template:` named in its front matter
+    (relative to the default template's directory), the nearest
+    template.html in its own or a parent directory under content_dir,
+    or the default template.
+    """
+
+    def __init__(self, default_path, content_dir, basepath="/", assets=None, minify=False):
+        self.default_path = default_path
+        self.content_dir = content_dir
+        self.basepath = basepath
+        self.assets = assets
+        self.minify = minify
+        self._templates = {}
+        self._section_paths = {}
+
+    def _section_path(self, directory):
+        if directory not in self._section_paths:
+            candidate = os.path.join(directory, SECTION_TEMPLATE)
+            if os.path.isfile(candidate):
+                found = candidate
+            elif os.path.abspath(directory) == os.path.abspath(self.content_dir) or not directory:
+                found = self.default_path
+            else:
+                found = self._section_path(os.path.dirname(directory))
+            self._section_paths[directory] = found
+        return self._section_paths[directory]
+
+    def path_for(self, page_path, meta=None):
+        # meta: the page's front matter, when the caller already parsed it
+        if meta is None:
+            meta = read_front_matter(page_path)
+        name = meta.get("template")
+        if name:
+            return os.path.join(os.path.dirname(self.default_path), name)
+        return self._section_path(os.path.dirname(page_path))
+
+    def get(self, path):
+        if path not in self._templates:
+            self._templates[path] = Template.load(path, self.basepath, self.assets, self.minify)
+        return self._templates[path]
+
+    def for_page(self, page_path, meta=None):
+        return self.get(self.path_for(page_path, meta))
+
+    def files(self):
+        """
+        Every template file and partial compiled so far.
+        """
+        return {dep for template in self._templates.values() for dep in template.dependencies}
+
+    def stamps(self):
+        """
+        (mtime_ns, size) of every file in files(), as it was when compiled.
+        """
+        return {dep: stat for template in self._templates.values() for dep, stat in template.stamps.items()}
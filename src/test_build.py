@@ -0,0 +1,1015 @@
+import ast
+import contextlib
+import gzip
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+from build import build_full, build_incremental
+import copy_static as copy_static_module
+from compress import compress_outputs
+from copy_static import copy_static
+from daemon import SiteModel, serve_socket, serve_stream
+from manifest import is_up_to_date
+from markdown_to_html import markdown_to_html_node
+from parse_cache import PARSER_MODULES, ParseCache
+from template import Template
+from profiling import BuildProfiler
+from search import query_index
+import generate_page as generate_page_module
+from generate_page import PageBuildError, generate_page, generate_pages_pipelined, collect_pages, generate_pages_recursive
+from shard import MergeError, build_shard, merge_shards, partition
+from watch import InotifyPoller, ScanPoller, SiteWatcher, changed_paths, snapshot
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class SiteTestCase(unittest.TestCase):
+    """
+    Lays out a tiny site (content/, static/, template.html) in a temp dir.
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        self.dest = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.root, "manifest.json")
+
+        write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome [in](/blog/post)")
+        write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nSome **text**")
+        write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        write(self.template, "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def out(self, *parts):
+        return os.path.join(self.dest, *parts)
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def build(self):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest)
+        return log.getvalue()
+
+    def test_first_build_generates_everything(self):
+        log = self.build()
+        self.assertIn("2/2 pages generated", log)
+        self.assertIn("<title>Home</title>", read(self.out("index.html")))
+        self.assertEqual(read(self.out("index.css")), "body { color: red; }")
+
+    def test_unchanged_build_does_nothing(self):
+        self.build()
+        log = self.build()
+        self.assertIn("0/2 pages generated, 0/1 static files copied, 0 outputs removed", log)
+
+    def test_leading_rule_without_front_matter(self):
+        write(os.path.join(self.content, "rule.md"), "---\n\n# Rule\n\ntext")
+        self.assertIn("3/3 pages generated", self.build())
+        self.assertIn("<div><p>---</p><h1>Rule</h1>", read(self.out("rule.html")))
+
+    def test_up_to_date_check(self):
+        roots = (self.content, self.static)
+        self.assertFalse(is_up_to_date(roots, "/", self.manifest))
+        self.build()
+        self.assertTrue(is_up_to_date(roots, "/", self.manifest))
+        self.assertFalse(is_up_to_date(roots, "/blog/", self.manifest))
+
+        os.remove(self.out("blog", "post", "index.html"))
+        self.assertFalse(is_up_to_date(roots, "/", self.manifest))
+        self.build()
+        self.assertTrue(is_up_to_date(roots, "/", self.manifest))
+
+        write(os.path.join(self.content, "new.md"), "# New")
+        self.assertFalse(is_up_to_date(roots, "/", self.manifest))
+        self.build()
+        write(self.template, "<b>{{ Title }}</b>{{ Content }}")
+        self.assertFalse(is_up_to_date(roots, "/", self.manifest))
+
+    def test_only_changed_page_is_regenerated(self):
+        self.build()
+        write(os.path.join(self.content, "index.md"), "# New Home")
+        log = self.build()
+        self.assertIn("1/2 pages generated", log)
+        self.assertNotIn("blog", log.split("Incremental build")[0])
+        self.assertIn("<title>New Home</title>", read(self.out("index.html")))
+
+    def test_template_change_regenerates_all_pages(self):
+        self.build()
+        write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.build()
+        self.assertIn("2/2 pages generated", log)
+
+    def test_deleted_sources_remove_outputs(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        log = self.build()
+        self.assertIn("2 outputs removed", log)
+        self.assertFalse(os.path.exists(self.out("blog")))
+        self.assertFalse(os.path.exists(self.out("index.css")))
+        self.assertTrue(os.path.exists(self.out("index.html")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(self.out("index.html"))
+        log = self.build()
+        self.assertIn("1/2 pages generated", log)
+        self.assertTrue(os.path.exists(self.out("index.html")))
+
+
+class TestSectionTemplates(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write(os.path.join(self.content, "blog", "template.html"), "<blog>{{> partials/nav.html }}{{ Content }}</blog>")
+        write(os.path.join(self.content, "blog", "partials", "nav.html"), "<nav>{{ Title }}</nav>")
+        write(os.path.join(self.root, "special.html"), "<special>{{ Content }}</special>")
+        write(os.path.join(self.content, "about.md"), "---\ntemplate: special.html\n---\n# About\n\nHi")
+
+    def build(self):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest)
+        return log.getvalue()
+
+    def test_templates_by_directory_and_front_matter(self):
+        self.build()
+        self.assertEqual(read(self.out("blog", "post", "index.html")), "<blog><nav>Post</nav><div><h1>Post</h1><p>Some <b>text</b></p></div></blog>")
+        self.assertEqual(read(self.out("about.html")), "<special><div><h1>About</h1><p>Hi</p></div></special>")
+        self.assertTrue(read(self.out("index.html")).startswith("<title>Home</title>"))
+
+    def test_section_template_change_rebuilds_only_that_section(self):
+        self.build()
+        write(os.path.join(self.content, "blog", "template.html"), "<b2>{{ Content }}</b2>")
+        log = self.build()
+        self.assertIn("1/3 pages generated", log)
+        self.assertIn("blog/post", log)
+
+    def test_partial_change_rebuilds_dependent_pages(self):
+        self.build()
+        write(os.path.join(self.content, "blog", "partials", "nav.html"), "<nav>new</nav>")
+        self.assertIn("1/3 pages generated", self.build())
+        self.assertIn("<nav>new</nav>", read(self.out("blog", "post", "index.html")))
+
+    def test_default_template_change_skips_other_sections(self):
+        self.build()
+        write(self.template, "<main>{{ Content }}</main>")
+        log = self.build()
+        self.assertIn("1/3 pages generated", log)
+        self.assertIn("Generating page from " + os.path.join(self.content, "index.md"), log)
+
+    def test_watch_rebuilds_only_dependents_of_partial(self):
+        self.build()
+        watcher = SiteWatcher(self.content, self.static, self.template, self.dest)
+        partial = os.path.join(self.content, "blog", "partials", "nav.html")
+        self.assertIn(partial, watcher.watched_files())
+        write(partial, "<nav>watched</nav>")
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            watcher.rebuild([partial])
+        self.assertEqual(log.getvalue().count("Page generated"), 1)
+        self.assertIn("<nav>watched</nav>", read(self.out("blog", "post", "index.html")))
+
+
+class TestStaticSync(SiteTestCase):
+    def sync(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            copy_static(self.static, self.dest, sync=True, verbose=True, **kwargs)
+        return log.getvalue()
+
+    def test_unchanged_files_are_not_copied(self):
+        self.assertIn("Copying file", self.sync())
+        self.assertEqual(self.sync(), "")
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write(os.path.join(self.static, "index.css"), "body { color: green; }")
+        self.assertIn("Copying file", self.sync())
+        self.assertEqual(read(self.out("index.css")), "body { color: green; }")
+
+    def test_stale_files_are_removed(self):
+        write(os.path.join(self.dest, "old", "gone.png"), "x")
+        self.sync()
+        self.assertFalse(os.path.exists(self.out("old")))
+        self.assertTrue(os.path.exists(self.out("index.css")))
+
+    def test_hardlinks_share_the_source_inode(self):
+        self.sync(link=True)
+        src = os.stat(os.path.join(self.static, "index.css"))
+        self.assertEqual(os.stat(self.out("index.css")).st_ino, src.st_ino)
+
+    def test_failed_copy_keeps_previous_file(self):
+        self.sync()
+        write(os.path.join(self.static, "index.css"), "body { color: green; }")
+        original = copy_static_module.shutil.copy2
+
+        def broken(src, dst):
+            write(dst, "body {")
+            raise OSError("disk full")
+
+        copy_static_module.shutil.copy2 = broken
+        try:
+            with self.assertRaises(OSError):
+                self.sync()
+        finally:
+            copy_static_module.shutil.copy2 = original
+        self.assertEqual(read(self.out("index.css")), "body { color: red; }")
+        self.assertEqual(os.listdir(self.dest), ["index.css"])
+
+    def test_incremental_build_never_deletes_pages(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest, link_static=True)
+            os.remove(os.path.join(self.static, "index.css"))
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest)
+        self.assertFalse(os.path.exists(self.out("index.css")))
+        self.assertTrue(os.path.exists(self.out("index.html")))
+
+
+class TestParseCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ParseCache(os.path.join(self.root, "cache"))
+
+    def render(self, name="index.html"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(os.path.join(self.content, "index.md"), self.template, self.out(name), "/", self.cache)
+        return read(self.out(name))
+
+    def test_hit_matches_uncached_render(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(os.path.join(self.content, "index.md"), self.template, self.out("plain.html"))
+        self.assertEqual(self.render("first.html"), read(self.out("plain.html")))
+        self.assertEqual(self.render("second.html"), read(self.out("plain.html")))
+
+    def test_hit_skips_parsing(self):
+        self.render()
+        key = self.cache.key(read(os.path.join(self.content, "index.md")))
+        self.cache.put(key, "From cache", "<p>cached</p>")
+        html = self.render()
+        self.assertIn("<title>From cache</title>", html)
+        self.assertIn("<p>cached</p>", html)
+
+    def test_key_depends_on_basepath_and_content(self):
+        self.assertNotEqual(self.cache.key("# a"), self.cache.key("# b"))
+        self.assertNotEqual(self.cache.key("# a", "/"), self.cache.key("# a", "/repo/"))
+
+    def test_parser_modules_cover_every_renderer_import(self):
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        seen = set()
+        pending = ["markdown_to_html"]
+        while pending:
+            name = pending.pop()
+            path = os.path.join(src_dir, name + ".py")
+            if name in seen or not os.path.exists(path):
+                continue  # standard library
+            seen.add(name)
+            with open(path, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    pending.extend(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module:
+                    pending.append(node.module)
+        self.assertLessEqual(seen, set(PARSER_MODULES))
+
+    def test_prune_evicts_least_recently_used(self):
+        self.cache.put("aa1", "old", "x" * 100)
+        self.cache.put("bb2", "new", "y" * 100)
+        old_path = self.cache._path("aa1")
+        os.utime(old_path, (1, 1))
+        self.cache.max_bytes = 150
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get("aa1"))
+        self.assertEqual(self.cache.get("bb2"), ("new", "y" * 100))
+
+
+class TestBuildProfiler(SiteTestCase):
+    def test_records_stages_and_pages(self):
+        profiler = BuildProfiler()
+        with profiler.profile(), contextlib.redirect_stdout(io.StringIO()):
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest)
+
+        for name in ("markdown_to_html_node", "text_to_textnodes", "to_html", "write page", "copy_static"):
+            self.assertIn(name, profiler.stage_seconds)
+        self.assertEqual(profiler.stage_calls["markdown_to_html_node"], 2)
+        self.assertEqual(len(profiler.page_seconds), 2)
+        self.assertIn("Slowest 1 pages", profiler.report(top=1))
+        self.assertEqual(read(self.out("index.html")).count("<title>Home</title>"), 1)
+
+    def test_uninstall_restores_functions(self):
+        original = generate_page_module.generate_page
+        with BuildProfiler().profile():
+            self.assertIsNot(generate_page_module.generate_page, original)
+        self.assertIs(generate_page_module.generate_page, original)
+
+
+class TestStreamingPages(SiteTestCase):
+    def generate(self, name, threshold):
+        original = generate_page_module.STREAM_THRESHOLD
+        generate_page_module.STREAM_THRESHOLD = threshold
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_page(os.path.join(self.content, "index.md"), self.template, self.out(name), "/base/")
+        finally:
+            generate_page_module.STREAM_THRESHOLD = original
+        return read(self.out(name))
+
+    def test_streamed_page_matches_in_memory_page(self):
+        write(
+            os.path.join(self.content, "index.md"),
+            "Intro before the title\n\n# Home\n\n- [a](/a)\n- _b_\n\n```\ncode\n\nblock\n```\n\n> quote",
+        )
+        self.assertEqual(self.generate("streamed.html", 0), self.generate("buffered.html", 1 << 40))
+
+    def test_failed_stream_leaves_no_output(self):
+        write(os.path.join(self.content, "index.md"), "# Home\n\nbroken **bold")
+        with self.assertRaises(ValueError):
+            self.generate("index.html", 0)
+        self.assertEqual(os.listdir(self.dest) if os.path.exists(self.dest) else [], [])
+
+
+class TestParallelBuild(SiteTestCase):
+    def generate(self, dest, jobs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, dest, "/base/", jobs)
+
+    def test_parallel_output_matches_serial(self):
+        for i in range(6):
+            write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n- item _{i}_\n- [link](/x/{i})")
+
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        self.generate(serial, 1)
+        self.generate(parallel, 3)
+
+        pages = collect_pages(self.content, serial)
+        self.assertEqual(len(pages), 8)
+        for _, serial_path in pages:
+            parallel_path = os.path.join(parallel, os.path.relpath(serial_path, serial))
+            with open(serial_path, "rb") as a, open(parallel_path, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_errors_are_reported_per_file(self):
+        write(os.path.join(self.content, "broken.md"), "# Broken\n\nunclosed **bold")
+        write(os.path.join(self.content, "untitled.md"), "no title here")
+
+        with self.assertRaises(PageBuildError) as cm:
+            self.generate(self.dest, 2)
+
+        failed = sorted(os.path.basename(path) for path, _ in cm.exception.failures)
+        self.assertEqual(failed, ["broken.md", "untitled.md"])
+        # the healthy pages were still written
+        self.assertTrue(os.path.exists(self.out("index.html")))
+        self.assertTrue(os.path.exists(self.out("blog", "post", "index.html")))
+
+
+class TestWatch(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest)
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.dest)
+        self.state = snapshot(self.content, self.static, self.template)
+
+    def rebuild(self):
+        current = snapshot(self.content, self.static, self.template)
+        paths = changed_paths(self.state, current)
+        self.state = current
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            self.watcher.rebuild(paths)
+        return paths, log.getvalue()
+
+    def test_edit_rebuilds_only_that_page(self):
+        write(os.path.join(self.content, "index.md"), "# Edited home page")
+        paths, log = self.rebuild()
+        self.assertEqual(paths, [os.path.join(self.content, "index.md")])
+        self.assertEqual(log.count("Page generated"), 1)
+        self.assertIn("<title>Edited home page</title>", read(self.out("index.html")))
+
+    def test_static_change_copies_only_that_file(self):
+        write(os.path.join(self.static, "index.css"), "body { color: blue; }")
+        _, log = self.rebuild()
+        self.assertNotIn("Page generated", log)
+        self.assertEqual(read(self.out("index.css")), "body { color: blue; }")
+
+    def test_template_change_rebuilds_every_page(self):
+        write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        _, log = self.rebuild()
+        self.assertEqual(log.count("Page generated"), 2)
+
+    def test_deleted_page_removes_output(self):
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.rebuild()
+        self.assertFalse(os.path.exists(self.out("blog")))
+
+    def test_broken_page_does_not_stop_watcher(self):
+        write(os.path.join(self.content, "index.md"), "no title yet")
+        _, log = self.rebuild()
+        self.assertIn("Error generating", log)
+
+
+class TestChangePollers(SiteTestCase):
+    def check_poller(self, poller_class):
+        poller = poller_class([self.content, self.static, self.template])
+        self.addCleanup(poller.close)
+        page = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.assertEqual(poller.poll(), [])
+
+        # edited in place, and saved by renaming a new file over the old one
+        write(page, "# Edited")
+        write(self.template + ".new", "{{ Content }}")
+        os.replace(self.template + ".new", self.template)
+        # files next to a watched file are not watched
+        write(os.path.join(self.root, "notes.txt"), "x")
+        self.assertEqual(poller.poll(), sorted([page, self.template]))
+
+        # a new directory, and a file inside it written right away
+        new_page = os.path.join(self.content, "new", "deeper", "index.md")
+        write(new_page, "# New")
+        self.assertEqual(poller.poll(), [new_page])
+        write(new_page, "# New, longer")
+        self.assertEqual(poller.poll(), [new_page])
+
+        # a renamed directory: its files are gone from the old path
+        moved = os.path.join(self.content, "articles")
+        os.rename(os.path.join(self.content, "blog"), moved)
+        self.assertEqual(poller.poll(), sorted([post, os.path.join(moved, "post", "index.md")]))
+        os.remove(os.path.join(moved, "post", "index.md"))
+        self.assertEqual(poller.poll(), [os.path.join(moved, "post", "index.md")])
+
+        # a partial picked up after a rebuild is watched from then on
+        partial = os.path.join(self.root, "partials", "nav.html")
+        write(partial, "<nav>")
+        self.assertEqual(poller.poll([self.content, self.static, self.template, partial]), [partial])
+        write(partial, "<nav>home</nav>")
+        self.assertEqual(poller.poll(), [partial])
+
+    def test_scan_poller(self):
+        self.check_poller(ScanPoller)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_poller(self):
+        self.check_poller(InotifyPoller)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_poller_falls_back_to_scanning(self):
+        poller = InotifyPoller([self.content, self.static, self.template])
+        self.addCleanup(poller.close)
+        poller.scan_only = True  # as after running out of inotify watches
+        write(os.path.join(self.content, "new", "index.md"), "# New")
+        self.assertEqual(poller.poll(), [os.path.join(self.content, "new", "index.md")])
+
+
+class TestPipelinedBuild(SiteTestCase):
+    def test_pipelined_output_matches_serial(self):
+        for i in range(20):
+            write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n**bold** {i}")
+
+        serial = os.path.join(self.root, "serial")
+        pipelined = os.path.join(self.root, "pipelined")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/b/")
+            generate_pages_recursive(self.content, self.template, pipelined, "/b/", io_threads=3)
+
+        for _, serial_path in collect_pages(self.content, serial):
+            self.assertEqual(read(serial_path), read(os.path.join(pipelined, os.path.relpath(serial_path, serial))))
+
+    def test_backpressure_and_failures(self):
+        write(os.path.join(self.content, "broken.md"), "# Broken\n\nunclosed `code")
+        for i in range(10):
+            write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}")
+        template = Template.load(self.template)
+
+        # room for two small pages; the larger ones go through one at a time
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures, _ = generate_pages_pipelined(
+                collect_pages(self.content, self.dest), lambda path: template, io_threads=2, max_in_flight_bytes=20
+            )
+
+        self.assertEqual([os.path.basename(path) for path, _ in failures], ["broken.md"])
+        self.assertTrue(os.path.exists(self.out("page9.html")))
+        self.assertFalse(os.path.exists(self.out("broken.html")))
+
+    def test_pages_in_flight_are_bounded_by_bytes(self):
+        for i in range(12):
+            write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n" + "words " * 200)
+        template = Template.load(self.template)
+        page_bytes = len(template.render("Page 10", markdown_to_html_node("words " * 200).to_html()))
+
+        held, peak = [], []
+        lock = threading.Lock()
+        original = generate_page_module.write_text
+
+        def slow_write(dest_path, html):
+            with lock:
+                held.append(len(html))
+                peak.append(sum(held))
+            threading.Event().wait(0.01)
+            with lock:
+                held.remove(len(html))
+            return original(dest_path, html)
+
+        generate_page_module.write_text = slow_write
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                failures, written = generate_pages_pipelined(
+                    collect_pages(self.content, self.dest), lambda path: template, io_threads=4,
+                    max_in_flight_bytes=3 * page_bytes,
+                )
+        finally:
+            generate_page_module.write_text = original
+        self.assertEqual((failures, written), ([], 14))
+        # pages are admitted by markdown size and then grow into their HTML,
+        # so the budget may be overshot by that growth, never by another page
+        self.assertLess(max(peak), 4 * page_bytes)
+
+
+class TestWriteIfChanged(SiteTestCase):
+    def build(self):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            build_full(self.content, self.static, self.template, self.dest,
+                       asset_cache=os.path.join(self.root, "assets-cache.json"))
+        return log.getvalue()
+
+    def test_unchanged_outputs_keep_their_mtime(self):
+        self.assertIn("Output: 3 files written, 0 unchanged, 0 removed", self.build())
+        for path in (self.out("index.html"), self.out("index.css")):
+            os.utime(path, ns=(1, 1))
+
+        # a fresh checkout: same bytes, new mtimes
+        os.utime(os.path.join(self.static, "index.css"))
+        write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nNew text")
+        log = self.build()
+
+        self.assertIn("Output: 1 files written, 2 unchanged, 0 removed", log)
+        self.assertIn("Page unchanged: " + self.out("index.html"), log)
+        self.assertEqual(os.stat(self.out("index.html")).st_mtime_ns, 1)
+        self.assertEqual(os.stat(self.out("index.css")).st_mtime_ns, 1)
+        self.assertIn("New text", read(self.out("blog", "post", "index.html")))
+
+    def test_identical_static_files_are_hashed_once(self):
+        self.build()
+        os.utime(os.path.join(self.static, "index.css"))  # a fresh checkout
+        hashed = []
+        original = copy_static_module.hash_file
+        copy_static_module.hash_file = lambda path: hashed.append(path) or original(path)
+        try:
+            self.build()
+            self.assertEqual(sorted(hashed), [self.out("index.css"), os.path.join(self.static, "index.css")])
+            del hashed[:]
+            self.build()
+            self.build()
+        finally:
+            copy_static_module.hash_file = original
+        self.assertEqual(hashed, [])
+
+    def test_outputs_without_sources_are_removed(self):
+        self.build()
+        write(self.out("old", "page.html"), "stale")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertIn("0 files written, 2 unchanged, 2 removed", self.build())
+        self.assertEqual(sorted(os.listdir(self.dest)), ["blog", "index.css"])
+
+    def test_failed_write_keeps_previous_output(self):
+        self.build()
+        template = Template("<p>{{ Content }}</p>")
+
+        class Broken:
+            def iter_html(self):
+                yield "<div>partial"
+                raise ValueError("render failed")
+
+        with self.assertRaises(ValueError):
+            generate_page_module.write_page(self.out("index.html"), template, "t", Broken())
+        self.assertIn("<title>Home</title>", read(self.out("index.html")))
+        self.assertFalse([name for name in os.listdir(self.dest) if name.endswith(".tmp")])
+
+
+class TestCompression(SiteTestCase):
+    def compress(self, paths, jobs=1):
+        return compress_outputs(paths, jobs, os.path.join(self.root, "compress.json"), verbose=False)
+
+    def test_siblings_only_where_they_pay_off(self):
+        page = self.out("page.html")
+        write(page, "<p>hello</p>" * 100)
+        write(self.out("tiny.css"), "a{}")
+        with open(self.out("noise.txt"), "wb") as f:
+            f.write(os.urandom(4096))
+        write(self.out("image.png"), "<p>hello</p>" * 100)
+
+        paths = [page, self.out("tiny.css"), self.out("noise.txt"), self.out("image.png")]
+        self.assertEqual(self.compress(paths, jobs=2), (1, 2, 0))
+        with gzip.open(page + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), read(page))
+        self.assertEqual(sorted(name for name in os.listdir(self.dest) if name.endswith(".gz")), ["page.html.gz"])
+
+    def test_only_changed_outputs_are_recompressed(self):
+        first, second = self.out("a.html"), self.out("b.html")
+        write(first, "<p>first</p>" * 100)
+        write(second, "<p>second</p>" * 100)
+        self.assertEqual(self.compress([first, second]), (2, 0, 0))
+        os.utime(first + ".gz", ns=(1, 1))
+
+        os.utime(first)  # same bytes, new mtime
+        write(second, "<p>changed</p>" * 100)
+        self.assertEqual(self.compress([first, second]), (1, 0, 1))
+        self.assertEqual(os.stat(first + ".gz").st_mtime_ns, 1)
+        with gzip.open(second + ".gz", "rt", encoding="utf-8") as f:
+            self.assertIn("changed", f.read())
+
+        os.remove(first + ".gz")
+        self.assertEqual(self.compress([first, second]), (1, 0, 1))
+        self.assertTrue(os.path.exists(first + ".gz"))
+
+    def test_full_build_keeps_siblings_only_while_compressing(self):
+        write(os.path.join(self.content, "index.md"), "# Home\n\n" + "Some words. " * 100)
+        cache = os.path.join(self.root, "compress.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_full(self.content, self.static, self.template, self.dest, compress=True, compress_cache=cache)
+            self.assertTrue(os.path.exists(self.out("index.html.gz")))
+            build_full(self.content, self.static, self.template, self.dest, compress=True, compress_cache=cache)
+            self.assertTrue(os.path.exists(self.out("index.html.gz")))
+            build_full(self.content, self.static, self.template, self.dest)
+        self.assertFalse(os.path.exists(self.out("index.html.gz")))
+
+    def test_rewritten_outputs_lose_stale_siblings(self):
+        write(os.path.join(self.content, "index.md"), "# Home\n\n" + "Some words. " * 100)
+        write(os.path.join(self.static, "index.css"), "body { color: red; }\n" * 100)
+        cache = os.path.join(self.root, "compress.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_full(self.content, self.static, self.template, self.dest, compress=True, compress_cache=cache)
+            self.assertTrue(os.path.exists(self.out("index.css.gz")))
+
+            # a full build leaves no manifest, so this build can't know siblings were written
+            write(os.path.join(self.content, "index.md"), "# Home\n\n" + "Other words. " * 100)
+            write(os.path.join(self.static, "index.css"), "body { color: blue; }\n" * 100)
+            build_incremental(self.content, self.static, self.template, self.dest, manifest_path=self.manifest)
+            self.assertFalse(os.path.exists(self.out("index.html.gz")))
+            self.assertFalse(os.path.exists(self.out("index.css.gz")))
+
+            build_full(self.content, self.static, self.template, self.dest, compress=True, compress_cache=cache)
+        with gzip.open(self.out("index.html.gz"), "rt", encoding="utf-8") as f:
+            self.assertIn("Other words", f.read())
+
+
+class TestFingerprintedAssets(SiteTestCase):
+    def build(self, fingerprint=True):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            build_incremental(self.content, self.static, self.template, self.dest, "/b/",
+                              manifest_path=self.manifest, fingerprint=fingerprint,
+                              asset_cache=os.path.join(self.root, "assets-cache.json"))
+        return log.getvalue()
+
+    def test_pages_link_to_hashed_names(self):
+        write(os.path.join(self.static, "img", "a.png"), "png")
+        write(os.path.join(self.content, "pic.md"), "# Pic\n\n![alt](/img/a.png) [css](/index.css)")
+        self.build()
+
+        assets = json.loads(read(self.out("assets.json")))
+        css, png = assets["/index.css"], assets["/img/a.png"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{12}\.css$")
+        self.assertTrue(os.path.exists(self.out(css[1:])))
+        # the plain name stays for references that are not rewritten
+        self.assertEqual(read(self.out("index.css")), read(self.out(css[1:])))
+
+        page = read(self.out("pic.html"))
+        self.assertIn(f'<link href="/b{css}">', page)
+        self.assertIn(f'<img src="/b{png}" alt="alt">', page)
+        self.assertIn(f'<a href="/b{css}">css</a>', page)
+
+    def test_files_requested_by_name_are_not_fingerprinted(self):
+        for name in ("CNAME", ".nojekyll", "robots.txt", os.path.join(".well-known", "security.txt")):
+            write(os.path.join(self.static, name), "x")
+        write(os.path.join(self.content, "files.md"), "# Files\n\n[cname](/CNAME) [robots](/robots.txt)")
+        self.build()
+
+        assets = json.loads(read(self.out("assets.json")))
+        self.assertEqual(sorted(assets), ["/index.css"])
+        self.assertEqual(
+            sorted(os.listdir(self.dest)),
+            sorted([".nojekyll", ".well-known", "CNAME", "assets.json", "files.html", "blog", "index.html",
+                    "index.css", assets["/index.css"][1:], "robots.txt"]),
+        )
+        page = read(self.out("files.html"))
+        self.assertIn('href="/b/CNAME"', page)
+        self.assertIn('href="/b/robots.txt"', page)
+
+    def test_turning_fingerprinting_off_removes_hashed_copies(self):
+        self.build()
+        css = json.loads(read(self.out("assets.json")))["/index.css"]
+        self.build(fingerprint=False)
+        self.assertFalse(os.path.exists(self.out(css[1:])))
+        self.assertFalse(os.path.exists(self.out("assets.json")))
+        self.assertEqual(read(self.out("index.css")), "body { color: red; }")
+
+    def test_unchanged_assets_are_not_rehashed(self):
+        self.build()
+        hashed = []
+        original = copy_static_module.hash_file
+        copy_static_module.hash_file = lambda path: hashed.append(path) or original(path)
+        try:
+            log = self.build()
+            self.assertEqual(hashed, [])
+            self.assertIn("0/2 pages generated", log)
+
+            old_css = json.loads(read(self.out("assets.json")))["/index.css"]
+            write(os.path.join(self.static, "index.css"), "body { color: blue; }")
+            log = self.build()
+        finally:
+            copy_static_module.hash_file = original
+
+        self.assertEqual(hashed, [os.path.join(self.static, "index.css")])
+        new_css = json.loads(read(self.out("assets.json")))["/index.css"]
+        self.assertNotEqual(new_css, old_css)
+        self.assertFalse(os.path.exists(self.out(old_css[1:])))
+        self.assertIn("2/2 pages generated", log)
+        self.assertIn(new_css, read(self.out("index.html")))
+
+    def test_asset_change_rebuilds_only_pages_linking_to_it(self):
+        write(os.path.join(self.static, "img", "a.png"), "png")
+        write(os.path.join(self.content, "pic.md"), "# Pic\n\n![alt](/img/a.png)")
+        self.build()
+        write(os.path.join(self.static, "img", "a.png"), "png2")
+        log = self.build()
+        self.assertIn("1/3 pages generated", log)
+        png = json.loads(read(self.out("assets.json")))["/img/a.png"]
+        self.assertIn(png, read(self.out("pic.html")))
+
+        # the template links to index.css, so every page embeds its URL
+        write(os.path.join(self.static, "index.css"), "body { color: blue; }")
+        self.assertIn("3/3 pages generated", self.build())
+
+    def test_turning_fingerprinting_off_restores_plain_names(self):
+        self.build()
+        self.build(fingerprint=False)
+        self.assertEqual(sorted(os.listdir(self.dest)), ["blog", "index.css", "index.html"])
+        self.assertIn('href="/b/index.css"', read(self.out("index.html")))
+
+
+class TestMinifiedBuild(SiteTestCase):
+    def build(self, minify=True):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            build_incremental(self.content, self.static, self.template, self.dest, "/",
+                              manifest_path=self.manifest, minify=minify)
+        return log.getvalue()
+
+    def test_toggling_minify_regenerates_every_page(self):
+        self.build(minify=False)
+        plain = read(self.out("index.html"))
+        self.assertIn("2/2 pages generated", self.build())
+        minified = read(self.out("index.html"))
+        self.assertIn("<link href=/index.css>", minified)
+        self.assertLess(len(minified), len(plain))
+        self.assertIn("0/2 pages generated", self.build())
+        self.assertIn("2/2 pages generated", self.build(minify=False))
+        self.assertEqual(read(self.out("index.html")), plain)
+
+
+class TestSearchIndex(SiteTestCase):
+    def build(self, incremental=True, search=True):
+        cache = os.path.join(self.root, "search-cache.json")
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            if incremental:
+                build_incremental(self.content, self.static, self.template, self.dest, "/b/",
+                                  manifest_path=self.manifest, search=search, search_cache=cache)
+            else:
+                build_full(self.content, self.static, self.template, self.dest, "/b/", search=search,
+                           search_cache=cache)
+        return log.getvalue()
+
+    def test_pages_are_found_by_their_words(self):
+        write(os.path.join(self.content, "blog", "other.md"), "# Other\n\nA **text** and\n\n```\nhidden\n```")
+        log = self.build(incremental=False)
+        self.assertIn("Search index: 3/3 pages indexed", log)
+        self.assertEqual(
+            query_index(self.dest, "TEXT"), [("/b/blog/other.html", "Other"), ("/b/blog/post/", "Post")]
+        )
+        self.assertEqual(query_index(self.dest, "welcome home"), [("/b/", "Home")])
+        self.assertEqual(query_index(self.dest, "hidden"), [])
+        self.assertEqual(query_index(self.dest, "the"), [])
+        shard = json.loads(read(self.out("search", "te.json")))
+        self.assertEqual(list(shard), ["text"])
+
+    def test_only_changed_pages_are_reindexed(self):
+        self.build()
+        index_mtime = os.stat(self.out("search", "we.json")).st_mtime_ns
+        write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nOther words")
+        self.assertIn("Search index: 1/2 pages indexed", self.build())
+        self.assertEqual(os.stat(self.out("search", "we.json")).st_mtime_ns, index_mtime)
+        self.assertFalse(os.path.exists(self.out("search", "te.json")))
+        self.assertEqual(query_index(self.dest, "words"), [("/b/blog/post/", "Post")])
+
+        # a deleted page leaves a hole in the ids that the next new page fills
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.build()
+        pages = json.loads(read(self.out("search", "index.json")))["pages"]
+        self.assertEqual(pages, [None, ["/b/", "Home"]])
+        write(os.path.join(self.content, "new.md"), "# New\n\nFresh")
+        self.assertIn("Search index: 1/2 pages indexed", self.build())
+        pages = json.loads(read(self.out("search", "index.json")))["pages"]
+        self.assertEqual(pages, [["/b/new.html", "New"], ["/b/", "Home"]])
+        self.assertEqual(query_index(self.dest, "fresh"), [("/b/new.html", "New")])
+
+    def test_turning_search_off_removes_the_index(self):
+        self.build()
+        self.build(search=False)
+        self.assertFalse(os.path.exists(self.out("search")))
+        self.build(incremental=False)
+        self.build(incremental=False, search=False)
+        self.assertFalse(os.path.exists(self.out("search")))
+
+
+class TestDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = SiteModel(self.content, self.static, self.template, self.dest, "/b/")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.model.build_site()
+
+    def expected(self, *parts):
+        reference = os.path.join(self.root, "reference")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_full(self.content, self.static, self.template, reference, "/b/")
+        return read(os.path.join(reference, *parts))
+
+    def test_site_matches_full_build(self):
+        self.assertEqual(read(self.out("index.html")), self.expected("index.html"))
+        self.assertEqual(read(self.out("blog", "post", "index.html")), self.expected("blog", "post", "index.html"))
+        self.assertEqual(read(self.out("index.css")), "body { color: red; }")
+
+    def test_edit_re_renders_only_changed_blocks(self):
+        page = os.path.join(self.content, "index.md")
+        write(page, "# Home\n\nWelcome [in](/blog/post)\n\nA _new_ paragraph")
+        result = self.model.build_page(page)
+        self.assertEqual((result["written"], result["rendered"], result["blocks"]), (True, 1, 3))
+        self.assertEqual(read(self.out("index.html")), self.expected("index.html"))
+        self.assertEqual(self.model.build_page(page)["written"], False)
+
+    def test_template_change_rejoins_cached_blocks(self):
+        write(self.template, "<h1>{{ Title }}</h1>\n{{ Content }}")
+        result = self.model.build_page(os.path.join(self.content, "index.md"))
+        self.assertEqual((result["written"], result["rendered"]), (True, 0))
+        self.assertEqual(read(self.out("index.html")), self.expected("index.html"))
+
+    def test_template_edit_right_after_first_build(self):
+        # one page: the template is compiled on the last request of build_site
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        model = SiteModel(self.content, self.static, self.template, self.dest, "/b/")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.build_site()
+        write(self.template, "<h1>{{ Title }}</h1>\n{{ Content }}")
+        self.assertTrue(model.render_page(os.path.join(self.content, "index.md")).startswith("<h1>Home</h1>"))
+
+    def test_deleted_page_is_removed(self):
+        page = os.path.join(self.content, "blog", "post", "index.md")
+        os.remove(page)
+        self.assertEqual(self.model.build_page(page)["removed"], True)
+        self.assertFalse(os.path.exists(self.out("blog")))
+        self.assertNotIn(page, self.model.pages)
+
+    def test_stream_protocol(self):
+        requests = [
+            {"op": "render", "path": os.path.join(self.content, "index.md")},
+            {"op": "build", "path": "README.md"},
+            {"op": "stats"},
+            {"op": "shutdown"},
+            {"op": "stats"},
+        ]
+        infile = io.StringIO("\n".join(json.dumps(request) for request in requests) + "\nnot json\n")
+        outfile = io.StringIO()
+        self.assertTrue(serve_stream(self.model, infile, outfile))
+        responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual(len(responses), 4)  # nothing is read after shutdown
+        self.assertEqual(responses[0]["html"], self.expected("index.html"))
+        self.assertEqual(responses[1], {"ok": False, "error": f"Not a page under {self.content}: README.md"})
+        self.assertEqual((responses[2]["pages"], responses[2]["ok"]), (2, True))
+
+    def test_invalid_json_does_not_stop_the_stream(self):
+        infile = io.StringIO('garbage\n{"op": "shutdown"}\n')
+        outfile = io.StringIO()
+        self.assertTrue(serve_stream(self.model, infile, outfile))
+        responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual([response["ok"] for response in responses], [False, True])
+        self.assertIn("invalid JSON", responses[0]["error"])
+
+        # a bad line after a valid request is answered as well
+        infile = io.StringIO('{"op": "stats"}\ngarbage\n')
+        self.assertFalse(serve_stream(self.model, infile, io.StringIO()))
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix sockets")
+    def test_socket_protocol(self):
+        path = os.path.join(self.root, "daemon.sock")
+        # left behind by a daemon that was killed
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(path)
+        server = threading.Thread(target=serve_socket, args=(self.model, path))
+        server.start()
+        for _ in range(100):
+            try:
+                with socket.socket(socket.AF_UNIX) as probe:
+                    probe.connect(path)
+                break
+            except OSError:
+                threading.Event().wait(0.01)
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+            stream = client.makefile("rw", encoding="utf-8")
+            stream.write(json.dumps({"op": "build", "path": os.path.join(self.content, "index.md")}) + "\n")
+            stream.write(json.dumps({"op": "shutdown"}) + "\n")
+            stream.flush()
+            responses = [json.loads(stream.readline()) for _ in range(2)]
+        server.join(5)
+        self.assertEqual(responses[0]["written"], False)
+        self.assertTrue(responses[1]["ok"])
+        self.assertFalse(server.is_alive())
+        self.assertFalse(os.path.exists(path))
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix sockets")
+    def test_socket_path_in_use_is_left_alone(self):
+        path = os.path.join(self.root, "daemon.sock")
+        write(path, "not a socket")
+        with self.assertRaises(FileExistsError):
+            serve_socket(self.model, path)
+        self.assertEqual(read(path), "not a socket")
+
+        os.remove(path)
+        with socket.socket(socket.AF_UNIX) as live:
+            live.bind(path)
+            live.listen()
+            with self.assertRaises(FileExistsError):
+                serve_socket(self.model, path)
+            self.assertTrue(os.path.exists(path))
+
+
+class TestShardedBuild(SiteTestCase):
+    def build_shards(self, count):
+        dirs = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in range(1, count + 1):
+                shard_dir = os.path.join(self.root, f"shard{index}")
+                build_shard(self.content, self.template, shard_dir, "/b/", index, count)
+                dirs.append(shard_dir)
+        return dirs
+
+    def test_partition_is_balanced_and_complete(self):
+        write(os.path.join(self.content, "big.md"), "# Big\n\n" + "x" * 1000)
+        for i in range(6):
+            write(os.path.join(self.content, f"page{i}.md"), "# Small\n\n" + "y" * 100)
+        pages = collect_pages(self.content, self.dest)
+
+        shards = partition(pages, 2)
+        self.assertEqual(sorted(pair for shard in shards for pair in shard), sorted(pages))
+        self.assertEqual(shards, partition(pages, 2))
+        # the big page outweighs all the others together, so it gets a shard to itself
+        self.assertIn([os.path.join(self.content, "big.md")], [[src for src, _ in shard] for shard in shards])
+
+    def test_merge_matches_full_build(self):
+        for i in range(5):
+            write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n_text_ {i}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_static(self.static, self.dest, verbose=False)
+            generate_pages_recursive(self.content, self.template, self.dest, "/b/")
+            merged = os.path.join(self.root, "merged")
+            merge_shards(self.build_shards(3), self.static, merged)
+
+        self.assertEqual(snapshot(merged).keys(), {p.replace(self.dest, merged) for p in snapshot(self.dest)})
+        for path in snapshot(self.dest):
+            self.assertEqual(read(path), read(path.replace(self.dest, merged)))
+
+    def test_merge_rejects_incomplete_or_conflicting_shards(self):
+        dirs = self.build_shards(2)
+        merged = os.path.join(self.root, "merged")
+        with self.assertRaisesRegex(MergeError, "exactly once"):
+            merge_shards(dirs[:1], self.static, merged)
+
+        write(os.path.join(self.static, "index.html"), "static page")
+        with self.assertRaisesRegex(MergeError, "index.html is produced by both"):
+            merge_shards(dirs, self.static, merged)
+        self.assertFalse(os.path.exists(merged))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
+import io
 import unittest
 import extract_title
-from markdown_block import BlockType, block_to_block_type, markdown_to_blocks
-from markdown_to_html import markdown_to_html_node
+from markdown_block import BlockType, block_to_block_type, iter_blocks, markdown_to_blocks
+from markdown_to_html import markdown_to_html_node, text_to_children
 from regex import extract_markdown_images, extract_markdown_links
 from textnode import TextNode, TextType, text_to_textnodes
 from htmlnode import HTMLNode
@@ -9,6 +10,10 @@ from htmlnode import LeafNode
 from htmlnode import ParentNode 
 from textnode_to_html import text_node_to_html_node
 from split_nodes_delimiter import split_nodes_delimiter, split_nodes_image, split_nodes_link
+from template import Template
+from render import render_many
+import render
+from front_matter import split_front_matter
 
 
 class TestTextNode(unittest.TestCase):
@@ -142,6 +147,29 @@ class TestParentNode(unittest.TestCase):
         node = ParentNode("div", [LeafNode("span", "x")], {"class": "wrapper"})
         self.assertEqual(node.to_html(), '<div class="wrapper"><span>x</span></div>')
 
+    def test_iter_html_chunks_join_to_to_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")])])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+        self.assertEqual(node.to_html(), "<div><p><b>x</b>y</p></div>")
+
+    def test_write_to_streams_into_file(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, str(i))]) for i in range(3)])
+        buf = io.StringIO()
+        node.write_to(buf)
+        self.assertEqual(buf.getvalue(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
+
+    def test_deeply_nested_tree_renders(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), len("deep") + 5000 * len("<span></span>"))
+
+    def test_nested_missing_children_raises(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", None)]).to_html()
+
     class TestTextNodeToHTML(unittest.TestCase):
         def test_text(self):
             node = TextNode("This is a text node", TextType.TEXT)
@@ -368,6 +396,11 @@ class TestSplitNodes(unittest.TestCase):
             result
         )
 
+    def test_link_free_nodes_pass_through_untouched(self):
+        node = TextNode("prose without brackets (or links)", TextType.TEXT)
+        self.assertIs(split_nodes_image([node])[0], node)
+        self.assertIs(split_nodes_link([node])[0], node)
+
 class TestTextToTextNodes(unittest.TestCase):
     def test_basic_text(self):
         text = "Just plain text"
@@ -429,6 +462,32 @@ class TestTextToTextNodes(unittest.TestCase):
             TextNode("link", TextType.LINK, "https://boot.dev"),
         ]
         self.assertEqual(result, expected)
+    def test_empty_text(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_markup_inside_code_is_literal(self):
+        self.assertEqual(
+            text_to_textnodes("call `snake_case(**kw)` now"),
+            [
+                TextNode("call ", TextType.TEXT),
+                TextNode("snake_case(**kw)", TextType.CODE),
+                TextNode(" now", TextType.TEXT),
+            ],
+        )
+
+    def test_underscores_inside_link_url(self):
+        self.assertEqual(
+            text_to_textnodes("see [docs](https://x.com/a_b_c)"),
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("docs", TextType.LINK, "https://x.com/a_b_c"),
+            ],
+        )
+
+    def test_unmatched_delimiter_raises(self):
+        with self.assertRaises(ValueError) as cm:
+            text_to_textnodes("this **never closes")
+        self.assertIn("Unmatched delimiter", str(cm.exception))
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -471,6 +530,32 @@ This is the same paragraph on a new line
         blocks = markdown_to_blocks(md)
         self.assertEqual(blocks, [])
 
+    def test_whitespace_only_line_separates_blocks(self):
+        self.assertEqual(markdown_to_blocks("one\n   \ntwo"), ["one", "two"])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "intro\n\n```\nfirst\n\nsecond\n```\n\noutro"
+        self.assertEqual(markdown_to_blocks(md), ["intro", "```\nfirst\n\nsecond\n```", "outro"])
+
+    def test_iter_blocks_classifies_while_scanning(self):
+        md = "# Title\n\n- a\n- b\n\n```\ncode\n\nmore\n```\n\n> quote"
+        self.assertEqual(
+            list(iter_blocks(md.split("\n"))),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.UNORDERED_LIST, ["- a", "- b"]),
+                (BlockType.CODE, ["```", "code", "", "more", "```"]),
+                (BlockType.QUOTE, ["> quote"]),
+            ],
+        )
+
+    def test_iter_blocks_reads_file_objects(self):
+        f = io.StringIO("para one\nstill one\n\n1. x\n2. y\n")
+        self.assertEqual(
+            list(iter_blocks(f)),
+            [(BlockType.PARAGRAPH, ["para one", "still one"]), (BlockType.ORDERED_LIST, ["1. x", "2. y"])],
+        )
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading_levels(self):
         self.assertEqual(block_to_block_type("# Heading"), BlockType.HEADING)
@@ -530,6 +615,69 @@ This is another paragraph with _italic_ text and `code` here
             "<div><p>This is <b>bolded</b> paragraph text in a p tag here</p><p>This is another paragraph with <i>italic</i> text and <code>code</code> here</p></div>",
         )
 
+    def test_plain_text_children_are_strings(self):
+        self.assertEqual(text_to_children("just words"), ["just words"])
+        children = text_to_children("a **b** c")
+        self.assertEqual(children[0], "a ")
+        self.assertEqual(children[1].to_html(), "<b>b</b>")
+        self.assertEqual(children[2], " c")
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (TextNode("x", TextType.TEXT), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_code_block_with_blank_lines(self):
+        html = markdown_to_html_node("```\nline one\n\nline two\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>line one\n\nline two</code></pre></div>")
+
+    def test_nested_inline_markup(self):
+        self.assertEqual(
+            markdown_to_html_node("**see [x](/y)** and [**b** _i_](/z)", "/r/").to_html(),
+            '<div><p><b>see <a href="/r/y">x</a></b> and <a href="/r/z"><b>b</b> <i>i</i></a></p></div>',
+        )
+        self.assertEqual(markdown_to_html_node("_a **b** c_").to_html(), "<div><p><i>a <b>b</b> c</i></p></div>")
+        # code spans stay literal, and so does a span whose text can't be parsed
+        self.assertEqual(
+            markdown_to_html_node("**`[a](/b)`** **snake_case**").to_html(),
+            "<div><p><b><code>[a](/b)</code></b> <b>snake_case</b></p></div>",
+        )
+        text = []
+        markdown_to_html_node("**see [x](/y)**", plain_text=text)
+        self.assertEqual(text, ["see ", "x"])
+
+    def test_raw_html_gets_the_basepath(self):
+        md = '<a href="/contact">c</a> **<img src="/a.png">** `<a href="/x">`\n\n```\n<a href="/y">\n```'
+        self.assertEqual(
+            markdown_to_html_node(md, "/repo/").to_html(),
+            '<div><p><a href="/repo/contact">c</a> <b><img src="/repo/a.png"></b> <code><a href="/x"></code></p>'
+            '<pre><code><a href="/y"></code></pre></div>',
+        )
+
+    def test_plain_text_is_collected_during_the_pass(self):
+        md = "# Title\n\nSome **bold** [link](/x) ![alt](/a.png)\n\n```\ncode\n```"
+        text = []
+        html = markdown_to_html_node(md, plain_text=text).to_html()
+        self.assertEqual(html, markdown_to_html_node(md).to_html())
+        self.assertEqual(text, ["Title", "Some ", "bold", " ", "link", " "])
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        self.assertEqual(
+            split_front_matter("---\ntemplate: blog.html\ntags: a\n---\n# Title"),
+            ({"template": "blog.html", "tags": "a"}, "# Title"),
+        )
+
+    def test_no_front_matter(self):
+        self.assertEqual(split_front_matter("# Title\n---"), ({}, "# Title\n---"))
+
+    def test_unclosed_fence_is_not_front_matter(self):
+        markdown = "---\ntemplate: x\n\n# Title"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+        self.assertEqual(
+            markdown_to_html_node(split_front_matter(markdown)[1]).to_html(),
+            "<div><p>--- template: x</p><h1>Title</h1></div>",
+        )
+
 class TestExtractTitle(unittest.TestCase):
     def test_simple_title(self):
         self.assertEqual(extract_title("# Hello"), "Hello")
@@ -571,4 +719,81 @@ More text
 if __name__ == "__main__":
     unittest.main()
 ```"""
-        self.assertEqual(extract_title(md), "if __name__ == \"__main__\":")
\ No newline at end of file
+        self.assertEqual(extract_title(md), "if __name__ == \"__main__\":")
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_placeholders(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render("Hi", "<p>x</p>"),
+            "<title>Hi</title><main><p>x</p></main>",
+        )
+
+    def test_basepath_rewritten_in_template_only_once(self):
+        template = Template('<link href="/index.css"><script src="/app.js"></script>{{ Content }}', "/repo/")
+        self.assertEqual(
+            template.parts[0],
+            '<link href="/repo/index.css"><script src="/repo/app.js"></script>',
+        )
+
+    def test_placeholders_in_content_are_not_substituted(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(
+            template.render("{{ Content }}", "<p>{{ Title }}</p>"),
+            "<title>{{ Content }}</title><p>{{ Title }}</p>",
+        )
+
+    def test_markdown_links_get_basepath(self):
+        html = markdown_to_html_node("[home](/) ![pic](/img.png) [ext](https://x.com)", "/repo/").to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/repo/">home</a> <img src="/repo/img.png" alt="pic"></img> '
+            '<a href="https://x.com">ext</a></p></div>',
+        )
+
+    def test_minify_collapses_template_whitespace(self):
+        template = Template(
+            '<!DOCTYPE html>\n<html>\n  <head>\n    <meta charset="utf-8" />\n'
+            '    <link rel="stylesheet" href="/index.css" />\n  </head>\n'
+            '  <body>\n    <pre>  keep\n  me </pre>\n    <main>{{ Content }}</main>\n  </body>\n</html>\n',
+            minify=True,
+        )
+        self.assertEqual(
+            template.render("", ""),
+            "<!DOCTYPE html><html><head><meta charset=utf-8><link rel=stylesheet href=/index.css></head>"
+            "<body><pre>  keep\n  me </pre><main></main></body></html>",
+        )
+
+    def test_minify_renders_shortest_markup(self):
+        node = markdown_to_html_node("- [home](/) ![](/img.png)\n- two", "/repo/")
+        self.assertEqual(
+            node.to_html(minify=True),
+            '<div><ul><li><a href=/repo/>home</a> <img src=/repo/img.png alt=""><li>two</ul></div>',
+        )
+        template = Template("<main>{{ Content }}</main>", minify=True)
+        self.assertEqual(template.render("", node), "<main>" + node.to_html(minify=True) + "</main>")
+
+class TestRenderMany(unittest.TestCase):
+    def test_results_in_order(self):
+        results = render_many(["# One", "**two**", "- three"])
+        self.assertEqual(
+            [r.html for r in results],
+            ["<div><h1>One</h1></div>", "<div><p><b>two</b></p></div>", "<div><ul><li>three</li></ul></div>"],
+        )
+        self.assertTrue(all(r.error is None for r in results))
+
+    def test_errors_do_not_abort_batch(self):
+        results = render_many(["fine", "broken **bold", "also fine"])
+        self.assertEqual(results[0].html, "<div><p>fine</p></div>")
+        self.assertIsNone(results[1].html)
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertEqual(results[2].html, "<div><p>also fine</p></div>")
+
+    def test_worker_pool_matches_in_process(self):
+        snippets = [f"# Item {i}\n\n_text_ [link](/x/{i})" for i in range(render.POOL_THRESHOLD)]
+        snippets[7] = "bad `code"
+        pooled = render_many(snippets, "/repo/", jobs=2, chunksize=50)
+        serial = render_many(snippets, "/repo/")
+        self.assertEqual([r.html for r in pooled], [r.html for r in serial])
+        self.assertIsInstance(pooled[7].error, ValueError)
+
@@ -1,5 +1,8 @@
+import re
 from enum import Enum, auto
 
+from regex import IMAGE_PATTERN, LINK_PATTERN
+
 class TextType(Enum):
     TEXT = auto()
     BOLD = auto()
@@ -9,6 +12,8 @@ class TextType(Enum):
     IMAGE = auto()
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -26,16 +31,71 @@ class TextNode:
         text_type_str = self.text_type.name.lower()
         return f"TextNode({self.text}, {text_type_str}, {self.url})"
     
+# One alternation covering every inline construct; scanning it left to right
+# with finditer tokenizes a whole text in a single pass.
+INLINE_RE = re.compile(
+    r"\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>.*?)_"
+    r"|`(?P<code>.*?)`"
+    "|" + IMAGE_PATTERN + "|" + LINK_PATTERN,
+    re.DOTALL,
+)
+
+# characters that can start an inline construct
+INLINE_MARKERS = ("*", "_", "`", "[")
+
+DELIMITERS = ("**", "_", "`")
+
+
+def _check_unmatched(text):
+    for delimiter in DELIMITERS:
+        if delimiter in text:
+            raise ValueError(f"Unmatched delimiter '{delimiter}' in text: {text}")
+
+
 def text_to_textnodes(text: str):
-    from split_nodes_delimiter import split_nodes_delimiter, split_nodes_image, split_nodes_link
+    """
+    Split text into TEXT/BOLD/ITALIC/CODE/IMAGE/LINK nodes in one
+    left-to-right pass. Markup inside a delimited span is kept as-is in
+    the node's text (markdown_to_html renders it as nested HTML), and a
+    delimiter left without a partner raises ValueError.
+    """
+    if not text:
+        return []
+
+    # fast path: plain prose has nothing to tokenize
+    if not any(marker in text for marker in INLINE_MARKERS):
+        return [TextNode(text, TextType.TEXT)]
+
+    nodes = []
+    last_index = 0
+
+    for match in INLINE_RE.finditer(text):
+        start = match.start()
+        if start > last_index:
+            plain = text[last_index:start]
+            _check_unmatched(plain)
+            nodes.append(TextNode(plain, TextType.TEXT))
+        last_index = match.end()
 
-    nodes = [TextNode(text, TextType.TEXT)]
+        kind = match.lastgroup
+        if kind == "bold":
+            if match["bold"]:
+                nodes.append(TextNode(match["bold"], TextType.BOLD))
+        elif kind == "italic":
+            if match["italic"]:
+                nodes.append(TextNode(match["italic"], TextType.ITALIC))
+        elif kind == "code":
+            if match["code"]:
+                nodes.append(TextNode(match["code"], TextType.CODE))
+        elif kind == "src":
+            nodes.append(TextNode(match["alt"], TextType.IMAGE, match["src"]))
+        else:
+            nodes.append(TextNode(match["anchor"], TextType.LINK, match["href"]))
 
-    # order matters!
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    if last_index < len(text):
+        plain = text[last_index:]
+        _check_unmatched(plain)
+        nodes.append(TextNode(plain, TextType.TEXT))
 
     return nodes
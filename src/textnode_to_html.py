@@ -2,25 +2,44 @@ from textnode import TextType  # (and optionally TextNode for typing)
 from htmlnode import LeafNode
 
 
-def text_node_to_html_node(text_node):
+def rewrite_basepath(html: str, basepath: str) -> str:
+    # adjust root-relative paths for GitHub Pages; used on the template and
+    # on raw HTML written into markdown, which passes through as text
+    if basepath == "/" or '="/' not in html:
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+
+def with_basepath(url, basepath="/", assets=None):
+    # fingerprinted static files are referenced by their hashed name
+    if assets:
+        url = assets.get(url, url)
+    # root-relative URLs get the site prefix (GitHub Pages serves from /<repo>/)
+    if basepath != "/" and url.startswith("/"):
+        return basepath + url[1:]
+    return url
+
+
+def text_node_to_html_node(text_node, basepath="/", assets=None):
     t = text_node.text_type
 
     if t == TextType.TEXT:
-        return LeafNode(None, text_node.text)
+        return LeafNode(None, rewrite_basepath(text_node.text, basepath))
 
     if t == TextType.BOLD:
-        return LeafNode("b", text_node.text)
+        return LeafNode("b", rewrite_basepath(text_node.text, basepath))
 
     if t == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
+        return LeafNode("i", rewrite_basepath(text_node.text, basepath))
 
     if t == TextType.CODE:
         return LeafNode("code", text_node.text)
 
     if t == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
+        return LeafNode("a", text_node.text, {"href": with_basepath(text_node.url, basepath, assets)})
 
     if t == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        return LeafNode("img", "", {"src": with_basepath(text_node.url, basepath, assets), "alt": text_node.text})
 
     raise ValueError(f"Unsupported TextType: {t}")
@@ -0,0 +1,472 @@
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from build import build_incremental
+from copy_static import copy_file, remove_output
+from generate_page import collect_pages, generate_page
+from template import SECTION_TEMPLATE, TemplateResolver
+
+LIVERELOAD_PATH = "/__livereload"
+
+# Long-polls the server; the request only returns once a rebuild happened,
+# so the page reloads as soon as the new output is on disk.
+LIVERELOAD_SCRIPT = (
+    "<script>(function(){var v=null;function poll(){"
+    "fetch('" + LIVERELOAD_PATH + "?v='+(v===null?-1:v)).then(function(r){return r.text()})"
+    ".then(function(t){if(v!==null&&t!==v){location.reload();return}v=t;poll()})"
+    ".catch(function(){setTimeout(poll,1000)})}poll()})();</script>"
+)
+
+
+class LiveReload:
+    """
+    A build counter that HTTP handlers can block on until it changes.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def bump(self):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, seen, timeout=25):
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the output directory, injecting the live-reload script into
+    HTML responses. Files on disk are left untouched.
+    """
+
+    livereload = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == LIVERELOAD_PATH:
+            try:
+                seen = int(parse_qs(url.query).get("v", ["-1"])[0])
+            except ValueError:
+                seen = -1
+            self._send(str(self.livereload.wait(seen)).encode(), "text/plain")
+            return
+
+        path = self.translate_path(url.path)
+        if os.path.isdir(path) and url.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+            if "</body>" in html:
+                html = html.replace("</body>", LIVERELOAD_SCRIPT + "</body>", 1)
+            else:
+                html += LIVERELOAD_SCRIPT
+            self._send(html.encode("utf-8"), "text/html; charset=utf-8")
+            return
+
+        super().do_GET()
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep the terminal for build output
+
+
+def snapshot(*roots):
+    """
+    Map every watched file to (mtime_ns, size).
+    """
+    state = {}
+    for root in roots:
+        if os.path.isfile(root):
+            st = os.stat(root)
+            state[root] = (st.st_mtime_ns, st.st_size)
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith(":Zone.Identifier"):
+                    continue  # skip Windows metadata files
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # deleted while walking
+                state[path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+def changed_paths(before, after):
+    return sorted(path for path in before.keys() | after.keys() if before.get(path) != after.get(path))
+
+
+class ScanPoller:
+    """
+    Finds changed files by stat'ing every watched file on each poll. Works
+    everywhere, but a poll costs time in proportion to the whole tree.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.state = snapshot(*self.paths)
+
+    def poll(self, paths=None):
+        """
+        Return the files created, changed or deleted since the last poll,
+        under `paths` (directories, watched recursively, and single files).
+        """
+        if paths is not None:
+            self.paths = list(paths)
+        current = snapshot(*self.paths)
+        changed = changed_paths(self.state, current)
+        self.state = current
+        return changed
+
+    def close(self):
+        pass
+
+
+# inotify(7)
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event: wd, mask, cookie, len, then len bytes of name
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyPoller:
+    """
+    Finds changed files from the events the kernel queued since the last
+    poll (Linux only), so a poll costs one read plus a stat per reported
+    file, however large the tree. Directories are watched recursively,
+    single files through their parent directory, so editors that save by
+    renaming a new file into place are seen too. If the kernel drops
+    events, or a new directory can't be watched, polls fall back to a
+    full scan.
+    """
+
+    def __init__(self, paths):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            self._raise("inotify_init1")
+        # watch descriptor -> directory, and the ones watched for every file
+        self._dirs = {}
+        self._recursive = set()
+        # single files watched through their parent directory
+        self._files = set()
+        self.paths = []
+        self.scan_only = False
+        try:
+            self._watch(paths)
+        except OSError:
+            self.close()
+            raise
+        # taken after the watches exist, so nothing changes unseen in between
+        self.state = snapshot(*self.paths)
+
+    def _raise(self, what):
+        errno = self._get_errno()
+        raise OSError(errno, f"{what}: {os.strerror(errno)}")
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory or "."), WATCH_MASK)
+        if wd < 0:
+            self._raise(f"inotify_add_watch {directory}")
+        return wd
+
+    def _watch_tree(self, root):
+        for dirpath, _, _ in os.walk(root):
+            wd = self._add_watch(dirpath)
+            # a directory that was renamed keeps its watch; record its new path
+            self._dirs[wd] = dirpath
+            self._recursive.add(wd)
+
+    def _watch(self, paths):
+        # start watching the paths not watched yet; returns them
+        new = [path for path in paths if path not in self.paths]
+        for path in new:
+            if os.path.isdir(path):
+                self._watch_tree(path)
+            else:
+                self._dirs.setdefault(self._add_watch(os.path.dirname(path)), os.path.dirname(path))
+                self._files.add(path)
+            self.paths.append(path)
+        return new
+
+    def _events(self):
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                yield wd, mask, name
+
+    def _full_scan(self):
+        current = snapshot(*self.paths)
+        changed = changed_paths(self.state, current)
+        self.state = current
+        return changed
+
+    def poll(self, paths=None):
+        """
+        Return the files created, changed or deleted since the last poll,
+        under `paths` (directories, watched recursively, and single files).
+        """
+        if self.scan_only:
+            if paths is not None:
+                self.paths = list(paths)
+            return self._full_scan()
+
+        dirty = set()
+        moved_dirs = []
+        overflow = False
+        for wd, mask, name in self._events():
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                # the directory is gone
+                self._dirs.pop(wd, None)
+                self._recursive.discard(wd)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if wd not in self._recursive and path not in self._files:
+                continue
+            if mask & IN_ISDIR:
+                moved_dirs.append(path)
+            elif not name.endswith(":Zone.Identifier"):
+                dirty.add(path)
+
+        try:
+            for path in self._watch(paths or ()):
+                dirty.update(snapshot(path))
+            for path in moved_dirs:
+                # a directory created, deleted or renamed: re-check all it held
+                if os.path.isdir(path):
+                    self._watch_tree(path)
+                    dirty.update(snapshot(path))
+                prefix = path + os.sep
+                dirty.update(known for known in self.state if known.startswith(prefix))
+        except OSError as e:
+            # e.g. out of inotify watches (fs.inotify.max_user_watches)
+            print(f"Watching by inotify failed ({e}); scanning every poll instead")
+            self.scan_only = True
+            overflow = True
+        if overflow:
+            return self._full_scan()
+
+        changed = []
+        for path in dirty:
+            try:
+                st = os.stat(path)
+                stat = (st.st_mtime_ns, st.st_size)
+            except (FileNotFoundError, NotADirectoryError):
+                stat = None
+            if stat != self.state.get(path):
+                changed.append(path)
+                if stat is None:
+                    del self.state[path]
+                else:
+                    self.state[path] = stat
+        return sorted(changed)
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def change_poller(paths):
+    """
+    The cheapest poller that works here: inotify on Linux, else a full scan.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyPoller(paths)
+        except (OSError, AttributeError) as e:
+            print(f"Watching by inotify failed ({e}); scanning every poll instead")
+    return ScanPoller(paths)
+
+
+class SiteWatcher:
+    """
+    Turns a list of changed source paths into the smallest rebuild: one
+    page per changed markdown file, one copy per changed static file, and
+    for a changed template or partial only the pages that depend on it.
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath="/"):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self._load_templates()
+
+    def _load_templates(self):
+        self.templates = TemplateResolver(self.template_path, self.content_dir, self.basepath)
+        # page -> template files it was last built with
+        self.page_deps = {}
+        for src_path, _ in collect_pages(self.content_dir, self.dest_dir):
+            self._record_deps(src_path)
+
+    def _record_deps(self, src_path):
+        try:
+            self.page_deps[src_path] = set(self.templates.for_page(src_path).dependencies)
+        except Exception:
+            self.page_deps[src_path] = set()
+
+    def watched_files(self):
+        """
+        Template files to poll on top of content/ and static/ (partials can
+        live anywhere).
+        """
+        files = {self.template_path}
+        for deps in self.page_deps.values():
+            files.update(deps)
+        return sorted(files)
+
+    def _dest_for(self, path, root):
+        return os.path.join(self.dest_dir, os.path.relpath(path, root))
+
+    def _under(self, path, root):
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(root)]) == os.path.abspath(root)
+
+    def _is_template(self, path):
+        if self._under(path, self.content_dir):
+            return path.endswith(".html")
+        return any(path in deps for deps in self.page_deps.values()) or path == self.template_path
+
+    def _generate(self, src_path, dest_path):
+        try:
+            generate_page(src_path, self.templates.for_page(src_path), dest_path, self.basepath)
+        except Exception as e:
+            # a half-typed page must not kill the watcher
+            print(f"Error generating {src_path}: {e}")
+        self._record_deps(src_path)
+
+    def rebuild(self, paths):
+        template_changes = {path for path in paths if self._is_template(path)}
+        if template_changes:
+            old_deps = self.page_deps
+            self._load_templates()
+            for src_path, dest_path in collect_pages(self.content_dir, self.dest_dir):
+                deps = old_deps.get(src_path, set()) | self.page_deps[src_path]
+                # a new section template.html changes which template pages pick
+                section_added = any(
+                    os.path.basename(path) == SECTION_TEMPLATE and self._under(src_path, os.path.dirname(path))
+                    for path in template_changes
+                )
+                if deps & template_changes or section_added:
+                    self._generate(src_path, dest_path)
+
+        for path in paths:
+            if path in template_changes:
+                continue
+
+            if self._under(path, self.content_dir) and path.endswith(".md"):
+                dest_path = os.path.splitext(self._dest_for(path, self.content_dir))[0] + ".html"
+                if os.path.isfile(path):
+                    self._generate(path, dest_path)
+                else:
+                    self.page_deps.pop(path, None)
+                    remove_output(dest_path, self.dest_dir)
+
+            elif self._under(path, self.static_dir):
+                dest_path = self._dest_for(path, self.static_dir)
+                if os.path.isfile(path):
+                    print(f"Copying file: {path} -> {dest_path}")
+                    copy_file(path, dest_path)
+                else:
+                    remove_output(dest_path, self.dest_dir)
+
+
+def serve(dest_dir, port, livereload):
+    handler = type("Handler", (LiveReloadHandler,), {"livereload": livereload})
+    server = ThreadingHTTPServer(("", port), partial(handler, directory=dest_dir))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def watch(content_dir, static_dir, template_path, dest_dir, basepath="/", port=8888, interval=0.05):
+    # bring the output up to date once, then only react to changes
+    build_incremental(content_dir, static_dir, template_path, dest_dir, basepath)
+
+    watcher = SiteWatcher(content_dir, static_dir, template_path, dest_dir, basepath)
+    livereload = LiveReload()
+    server = serve(dest_dir, port, livereload)
+    print(f"Serving {dest_dir} at http://localhost:{port}/ (watching for changes, Ctrl+C to stop)")
+
+    watched = [content_dir, static_dir, *watcher.watched_files()]
+    poller = change_poller(watched)
+    try:
+        while True:
+            time.sleep(interval)
+            paths = poller.poll(watched)
+            if not paths:
+                continue
+            started = time.perf_counter()
+            watcher.rebuild(paths)
+            livereload.bump()
+            print(f"Rebuilt {len(paths)} changed file(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+            # only a rebuild can change which partials pages include
+            watched = [content_dir, static_dir, *watcher.watched_files()]
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.close()
+        server.shutdown()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="main.py watch", description="Rebuild on change and serve docs/ with live reload")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.05,
+        help="seconds between polls of content/, static/ and template.html (default: 0.05)",
+    )
+    args = parser.parse_args(argv)
+    watch("content", "static", "template.html", "docs", args.basepath, args.port, args.interval)